@@ -0,0 +1,187 @@
+"""ベンチマークの登録・計測・保存・比較（pytest-benchmark と同じ考え方の小さな実装）
+
+    @benchmark("weather.parse", params={"fixture": [...]})
+    def bench_parse(b, fixture):
+        body = load(fixture)                  # 準備は計測しない
+        b(parse, body)                        # parse(body) をくり返して計測
+        b.items = 1                           # 1回あたりの件数（items/s の計算用）
+
+計測は1ラウンドが MIN_ROUND_TIME 以上になるよう回数（iterations）を決めてから、
+max_time 秒か max_rounds ラウンドまでくり返す。結果は1回あたりの秒数で、
+min / median / mean / stddev と ops（1秒あたりの回数）を持つ。
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from itertools import product
+
+MIN_ROUND_TIME = 0.005
+MIN_ROUNDS = 5
+MAX_ROUNDS = 1000
+MAX_TIME = 1.0
+# 比較で「遅くなった」とみなす median の増加率
+REGRESSION_THRESHOLD = 0.10
+
+# name -> (関数, params)
+REGISTRY = {}
+
+
+def benchmark(name, params=None):
+    """ベンチマーク関数を登録する。params は {引数名: 値のリスト}（全組み合わせを実行）"""
+    def register(fn):
+        REGISTRY[name] = (fn, params or {})
+        return fn
+    return register
+
+
+def param_sets(params):
+    keys = list(params)
+    for values in product(*(params[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+def full_name(name, param):
+    if not param:
+        return name
+    return f"{name}[{','.join(f'{k}={v}' for k, v in param.items())}]"
+
+
+class Bench:
+    """ベンチマーク関数に渡す計測器。b(fn, *args) で fn(*args) を計測する"""
+
+    def __init__(self, max_time=MAX_TIME, min_rounds=MIN_ROUNDS, max_rounds=MAX_ROUNDS):
+        self.max_time = max_time
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.items = 1          # 1回の呼び出しで処理する件数
+        self.extra = {}         # 結果に一緒に保存する値
+        self.timings = None     # 1回あたりの秒数（ラウンドごと）
+        self.iterations = 0
+
+    def _calibrate(self, fn, args):
+        iterations = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn(*args)
+            elapsed = time.perf_counter() - start
+            if elapsed >= MIN_ROUND_TIME or iterations >= 1 << 20:
+                return iterations
+            iterations *= 2 if elapsed * 10 >= MIN_ROUND_TIME else 10
+
+    def __call__(self, fn, *args):
+        iterations = self._calibrate(fn, args)
+        timings = []
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            deadline = time.perf_counter() + self.max_time
+            while len(timings) < self.max_rounds:
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    fn(*args)
+                timings.append((time.perf_counter() - start) / iterations)
+                if len(timings) >= self.min_rounds and time.perf_counter() > deadline:
+                    break
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self.timings, self.iterations = timings, iterations
+
+    def result(self):
+        t = self.timings
+        median = statistics.median(t)
+        return {"rounds": len(t), "iterations": self.iterations,
+                "min": min(t), "max": max(t), "mean": statistics.fmean(t), "median": median,
+                "stddev": statistics.stdev(t) if len(t) > 1 else 0.0,
+                "ops": 1 / median if median else None,
+                "items_per_sec": self.items / median if median else None,
+                "extra": self.extra}
+
+
+def run(names=None, selected=None, max_time=MAX_TIME, out=print):
+    """登録済みのベンチマークを実行して結果のリストを返す
+
+    selected: 名前に含まれていれば実行する文字列のリスト（None なら全部）
+    """
+    results = []
+    for name in names or REGISTRY:
+        fn, params = REGISTRY[name]
+        for param in param_sets(params):
+            label = full_name(name, param)
+            if selected and not any(s in label for s in selected):
+                continue
+            b = Bench(max_time)
+            fn(b, **param)
+            if b.timings is None:
+                raise RuntimeError(f"{label} did not call the benchmark fixture")
+            result = {"name": label, "group": name.split(".")[0], "params": param, **b.result()}
+            results.append(result)
+            out(format_result(result))
+    return results
+
+
+def format_result(r):
+    return (f"{r['name']:<52} median {_fmt_time(r['median']):>10}  min {_fmt_time(r['min']):>10}  "
+            f"± {r['stddev'] / r['mean'] * 100 if r['mean'] else 0:>5.1f}%  "
+            f"{r['items_per_sec']:>14,.0f} items/s")
+
+
+def _fmt_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f}{unit}"
+    return f"{seconds / 1e-9:.1f}ns"
+
+
+def machine_info():
+    """結果と一緒に保存する実行環境（比較するときに同じ環境か確認する）"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"python": sys.version.split()[0], "implementation": platform.python_implementation(),
+            "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "commit": commit or None}
+
+
+def save(results, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    data = {"datetime": datetime.now().isoformat(timespec="seconds"), "machine_info": machine_info(),
+            "benchmarks": results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """2回分の結果を median で比較する。戻り値は (表示用の行, 遅くなったベンチマーク名)"""
+    before = {r["name"]: r for r in old["benchmarks"]}
+    lines, regressions = [], []
+    for r in new["benchmarks"]:
+        prev = before.get(r["name"])
+        if prev is None:
+            lines.append(f"{r['name']:<52} (new)")
+            continue
+        change = r["median"] / prev["median"] - 1
+        mark = ""
+        if change > threshold:
+            mark = "  REGRESSION"
+            regressions.append(r["name"])
+        elif change < -threshold:
+            mark = "  faster"
+        lines.append(f"{r['name']:<52} {_fmt_time(prev['median']):>10} -> {_fmt_time(r['median']):>10}  "
+                     f"{change * 100:>+7.1f}%{mark}")
+    return lines, regressions
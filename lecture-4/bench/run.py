@@ -0,0 +1,63 @@
+"""lecture-4 のアプリ（weather / calculater / hello-world）のベンチマークをまとめて実行する
+
+画面は表示しない（要 flet / requests）。取得はローカルのスタブサーバー
+（weather/bench/stub_server.py）に対して行う。結果は JSON に保存し、前回の
+結果と median で比較できる。
+
+    python bench/run.py                                  # 全部実行して results/<日時>.json に保存
+    python bench/run.py -k weather.db -k calc.calculate  # 名前に含まれるものだけ
+    python bench/run.py --quick                          # 短時間（大きい履歴を除き、1件0.2秒）
+    python bench/run.py --compare results/before.json    # 前回より10%以上遅いものがあれば終了コード1
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import harness  # noqa: E402
+import suite_calculator  # noqa: E402,F401  import で登録される
+import suite_weather  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="lecture-4 のベンチマーク")
+    parser.add_argument("-k", dest="selected", action="append", help="名前にこの文字列を含むものだけ実行")
+    parser.add_argument("--max-time", type=float, default=harness.MAX_TIME, help="1件あたりの計測時間（秒）")
+    parser.add_argument("--quick", action="store_true", help="大きい履歴を除き、計測時間を短くする")
+    parser.add_argument("--out", help="結果のJSON（既定は results/<日時>.json）")
+    parser.add_argument("--compare", help="比較する前回の結果のJSON")
+    parser.add_argument("--threshold", type=float, default=harness.REGRESSION_THRESHOLD,
+                        help="遅くなったとみなす median の増加率")
+    parser.add_argument("--list", action="store_true", help="ベンチマークの名前を表示して終わる")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        suite_weather.HISTORY_SIZES[:] = suite_weather.HISTORY_SIZES[:-1]
+        args.max_time = min(args.max_time, 0.2)
+    if args.list:
+        for name, (_, params) in harness.REGISTRY.items():
+            for param in harness.param_sets(params):
+                print(harness.full_name(name, param))
+        return 0
+
+    results = harness.run(selected=args.selected, max_time=args.max_time)
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    print(f"\nsaved: {harness.save(results, out)}")
+
+    if args.compare:
+        lines, regressions = harness.compare(harness.load(args.compare), harness.load(out), args.threshold)
+        print(f"\ncompared with {args.compare}:")
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
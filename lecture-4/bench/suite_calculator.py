@@ -0,0 +1,92 @@
+"""calculater と hello-world のベンチマーク（計算・表示の整形・UIの組み立て）"""
+import importlib.util
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LECTURE_DIR = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, os.path.join(LECTURE_DIR, "calculater", "src"))
+
+import flet as ft  # noqa: E402
+
+from harness import benchmark  # noqa: E402
+from numeric import BACKENDS  # noqa: E402
+
+ft.app = lambda *args, **kwargs: None  # main.py の import でアプリを起動しない
+
+
+def load_main(app):
+    """lecture-4/<app>/src/main.py を別名で読み込む（どのアプリも main.py なので）"""
+    path = os.path.join(LECTURE_DIR, app, "src", "main.py")
+    spec = importlib.util.spec_from_file_location(f"{app.replace('-', '_')}_main", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+calc_main = load_main("calculater")
+hello_main = load_main("hello-world")
+
+OPERATORS = ["+", "-", "*", "/", "^"]
+
+
+def _operands(backend, n=1000):
+    """同じ乱数列から作ったオペランドの組（バックエンドごとに表示から読み直す）"""
+    rng = random.Random(0)
+    pairs = [(f"{rng.uniform(-1000, 1000):.3f}", f"{rng.uniform(0.5, 3):.2f}") for _ in range(n)]
+    return [(backend.parse(a), backend.parse(b)) for a, b in pairs]
+
+
+# --- 計算 ---
+@benchmark("calc.calculate", params={"backend": list(BACKENDS), "op": OPERATORS})
+def bench_calculate(b, backend, op):
+    app = calc_main.CalculatorApp(BACKENDS[backend]())
+    pairs = _operands(app.backend)
+    if op == "^":
+        pairs = [(abs(x) % 10, y) for x, y in pairs]
+    calculate = app.calculate
+    b(lambda: [calculate(x, y, op) for x, y in pairs])
+    b.items = len(pairs)
+
+
+@benchmark("calc.format_number", params={"backend": list(BACKENDS)})
+def bench_format_number(b, backend):
+    app = calc_main.CalculatorApp(BACKENDS[backend]())
+    # 整数・小数・指数表記になる大小の数を含める
+    values = [app.calculate(x, y, "/") for x, y in _operands(app.backend)]
+    values += [x * 10 ** 12 for x in values[:100]] + [x / 10 ** 9 for x in values[:100]]
+    fmt = app.format_number
+    b(lambda: [fmt(v) for v in values])
+    b.items = len(values)
+
+
+@benchmark("calc.button_clicked")
+def bench_button_clicked(b):
+    """キー入力1回の処理（update() は画面への送信なので外す）"""
+    app = calc_main.CalculatorApp()
+    app.update = lambda: None
+    keys = list("12+34*5=") + ["sqrt", "+/-", "^", "2", "=", "sin", "π", "/", "0", "=", "7", "AC"]
+    events = [SimpleNamespace(control=SimpleNamespace(data=key)) for key in keys]
+    clicked = app.button_clicked
+    b(lambda: [clicked(e) for e in events])
+    b.items = len(events)
+
+
+# --- UIの組み立て（画面には送らない） ---
+@benchmark("calc.ui.build")
+def bench_calc_build(b):
+    b(calc_main.CalculatorApp)
+
+
+@benchmark("hello.ui.build")
+def bench_hello_build(b):
+    """hello-world の main(page)。page は add() された部品を受け取るだけの入れ物"""
+    def build():
+        page = SimpleNamespace(controls=[], floating_action_button=None)
+        page.add = lambda *controls: page.controls.extend(controls)
+        hello_main.main(page)
+        return page
+
+    b(build)
@@ -0,0 +1,144 @@
+"""weather アプリのベンチマーク（解析・DB・取得・UIの組み立て）"""
+import glob
+import itertools
+import os
+import random
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+WEATHER_DIR = os.path.join(BENCH_DIR, "..", "weather")
+sys.path.insert(0, os.path.join(WEATHER_DIR, "src"))
+sys.path.insert(0, os.path.join(WEATHER_DIR, "bench"))
+
+import forecast_parser  # noqa: E402
+from area_index import build_index  # noqa: E402
+from area_menu import build_area_menu  # noqa: E402
+from forecast_service import refresh_forecast  # noqa: E402
+from forecast_view import build_card  # noqa: E402
+from harness import benchmark  # noqa: E402
+from http_cache import HttpCache  # noqa: E402
+from stub_server import StubJMAServer, load_fixture  # noqa: E402
+from weather_db import WeatherDB  # noqa: E402
+
+FIXTURES = sorted(os.path.basename(p) for p in glob.glob(os.path.join(WEATHER_DIR, "bench", "fixtures",
+                                                                       "forecast_*.json")))
+# 履歴の行数（予報の行数）。--quick では最後を使わない
+HISTORY_SIZES = [1000, 10000, 100000]
+AREAS = [f"{i:02d}0000" for i in range(1, 48)]
+REPORT_HOURS = (5, 11, 17)
+
+
+# --- 予報JSONの解析 ---
+@benchmark("weather.parse", params={"fixture": FIXTURES})
+def bench_parse(b, fixture):
+    body = load_fixture(fixture)
+    b(lambda: forecast_parser.to_forecast_list(forecast_parser.parse(body)))
+    b.extra["bytes"] = len(body)
+
+
+@benchmark("weather.parse_area")
+def bench_parse_area(b):
+    body = load_fixture("area.json")
+    b(lambda: build_index(forecast_parser.loads(body)))
+    b.extra["bytes"] = len(body)
+
+
+# --- DB ---
+def _report_rows(n):
+    """n 回目の発表の全地域・3日分の行（WeatherDB.import_rows の形）"""
+    day, slot = divmod(n, len(REPORT_HOURS))
+    created = f"2025-01-01 00:00:00+{n:08d}"
+    report = f"{day:06d}T{REPORT_HOURS[slot]:02d}:00"
+    return [(area, f"2025-{(day + d) % 12 + 1:02d}-{(day + d) % 28 + 1:02d}", "晴れ　時々　くもり",
+             "北の風", 1 + d, 10 + d, created, report)
+            for area in AREAS for d in range(3)]
+
+
+def _history_db(tmp, rows):
+    """rows 行の履歴を持つDBを作る。戻り値は (db, 次の発表の番号)"""
+    db = WeatherDB(os.path.join(tmp, f"history_{rows}.db"))
+    db.import_rows([(area, area) for area in AREAS])
+    per_report = len(AREAS) * 3
+    reports = max(1, rows // per_report)
+    for n in range(reports):
+        db.import_rows(rows=_report_rows(n), wait=False)
+    db.import_rows()   # 書き込みの完了を待つ
+    return db, reports
+
+
+@benchmark("weather.db.save", params={"history": HISTORY_SIZES})
+def bench_db_save(b, history):
+    """取得1回分（1地域・3日分）の save_data。発表ごとに新しい行になる"""
+    forecasts = forecast_parser.to_forecast_list(forecast_parser.parse(load_fixture(FIXTURES[0])))
+    with tempfile.TemporaryDirectory() as tmp:
+        db, _ = _history_db(tmp, history)
+        counter = itertools.count()
+
+        def save():
+            report = f"9{next(counter):09d}"
+            db.save_data(AREAS[0], "area", [{**f, "report_datetime": report} for f in forecasts])
+
+        b(save)
+        b.items = len(forecasts)
+        db.close()
+
+
+@benchmark("weather.db.import", params={"history": HISTORY_SIZES})
+def bench_db_import(b, history):
+    """発表1回分（全地域）を1トランザクションで取り込む"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db, reports = _history_db(tmp, history)
+        counter = itertools.count(reports)
+        b(lambda: db.import_rows(rows=_report_rows(next(counter))))
+        b.items = len(AREAS) * 3
+        db.close()
+
+
+@benchmark("weather.db.get_latest", params={"history": HISTORY_SIZES})
+def bench_db_get_latest(b, history):
+    with tempfile.TemporaryDirectory() as tmp:
+        db, _ = _history_db(tmp, history)
+        areas = itertools.cycle(AREAS)
+        b(lambda: db.get_latest(next(areas)))
+        db.close()
+
+
+@benchmark("weather.db.get_by_date", params={"history": HISTORY_SIZES})
+def bench_db_get_by_date(b, history):
+    with tempfile.TemporaryDirectory() as tmp:
+        db, _ = _history_db(tmp, history)
+        rng = random.Random(0)
+        keys = [(rng.choice(AREAS), f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}") for _ in range(256)]
+        queries = itertools.cycle(keys)
+        b(lambda: db.get_by_date(*next(queries), limit=50))
+        db.close()
+
+
+# --- 取得（ローカルのスタブサーバー） ---
+@benchmark("weather.fetch.refresh", params={"cache": ["off", "on"]})
+def bench_fetch_refresh(b, cache):
+    """refresh_forecast（取得→解析→保存）。cache=on は TTL 内のキャッシュから返す"""
+    with tempfile.TemporaryDirectory() as tmp, StubJMAServer() as stub:
+        db = WeatherDB(os.path.join(tmp, "fetch.db"))
+        http_cache = HttpCache(os.path.join(tmp, "cache.db")) if cache == "on" else None
+        areas = itertools.cycle(AREAS)
+        b(lambda: refresh_forecast(db, next(areas), "area", http_cache, None, stub.forecast_url))
+        b.extra["requests"] = sum(stub.requests.values())
+        db.close()
+
+
+# --- UIの組み立て（画面には送らない） ---
+@benchmark("weather.ui.area_menu", params={"lazy": [True, False]})
+def bench_area_menu(b, lazy):
+    index = build_index(forecast_parser.loads(load_fixture("area.json")))
+    b(lambda: build_area_menu(index, print, lazy=lazy))
+
+
+@benchmark("weather.ui.cards")
+def bench_cards(b):
+    """予報履歴の1ページ（50件）のカード"""
+    rows = [(i, "130000", "2025-01-10", "晴れ　時々　くもり", "北の風", 1, 10, "2025-01-10 11:00:00")
+            for i in range(50)]
+    b(lambda: [build_card(r) for r in rows])
+    b.items = len(rows)
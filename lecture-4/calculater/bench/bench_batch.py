@@ -0,0 +1,63 @@
+"""バッチ評価（NumPy）と、1要素ずつ evaluate() を呼ぶループの速度を比較
+
+    python bench/bench_batch.py [--size 1000000]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import expression  # noqa: E402
+from batch import evaluate_batch  # noqa: E402
+
+EXPRESSIONS = [
+    "x * x + 2 * x + 1",
+    "sqrt(x) + 1 / x",
+    "log(x) * sin(x) - cos(x) ^ 2",
+    "tan(x) + x%",
+]
+
+
+def python_loop(text, xs):
+    """比較用: 要素ごとに evaluate() を呼び、"Error" は NaN にする"""
+    out = []
+    for x in xs:
+        try:
+            value = expression.evaluate(text, x=x)
+        except expression.CalcError:
+            value = math.nan
+        out.append(value if math.isfinite(value) else math.nan)
+    return out
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(size):
+    xs = np.random.default_rng(0).uniform(-360, 360, size)
+    xs[::97] = 90.0  # tan(90) と 0 以下の値を必ず含める
+    xs[::101] = 0.0
+    items = xs.tolist()
+    print(f"{size:,} elements per expression")
+    print(f"{'expression':<32}{'python loop':>14}{'numpy batch':>14}{'speedup':>10}{'NaN':>10}")
+    for text in EXPRESSIONS:
+        loop_time, expected = timed(lambda: python_loop(text, items))
+        batch_time, result = timed(lambda: evaluate_batch(text, x=xs))
+        assert np.allclose(result, expected, equal_nan=True), text
+        print(f"{text:<32}{size / loop_time:>12,.0f}/s{size / batch_time:>12,.0f}/s"
+              f"{loop_time / batch_time:>9.0f}x{int(np.isnan(result).sum()):>10,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.size)
@@ -0,0 +1,52 @@
+"""式エンジンの評価速度（evaluations/sec）を計測
+
+    python bench/bench_expression.py [--seconds 1.0]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import expression  # noqa: E402
+
+EXPRESSIONS = [
+    "1 + 2 * 3",
+    "(1 + 2) * 3 ^ 2 / 4",
+    "sqrt(16) + log(1000) - sin(30) * cos(60)",
+    "2 ^ 10 - π * e",
+    "x * x + 2 * x + 1",
+]
+
+
+def rate(fn, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for _ in range(1000):
+            fn()
+        count += 1000
+    return count / (time.perf_counter() - start)
+
+
+def run(seconds):
+    compiled = [expression.compile_expression(text) for text in EXPRESSIONS]
+    cases = {
+        "tokenize + parse (no cache)": lambda: [expression.parse(t) for t in EXPRESSIONS],
+        "compile_expression (no cache)": lambda: [expression.CompiledExpression(t, expression.parse(t))
+                                                  for t in EXPRESSIONS],
+        "evaluate() (LRU cache hit)": lambda: [expression.evaluate(t, x=3.0) for t in EXPRESSIONS],
+        "compiled expr(**vars)": lambda: [e(x=3.0) for e in compiled],
+    }
+    print(f"{len(EXPRESSIONS)} expressions per call")
+    for label, fn in cases.items():
+        print(f"{label:<32}{rate(fn, seconds) * len(EXPRESSIONS):>14,.0f} evaluations/s")
+    print(expression.cache_info())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+    run(args.seconds)
@@ -0,0 +1,70 @@
+"""計算履歴の書き込み・ページ読み込み・再計算の速度を計測
+
+    python bench/bench_history.py [--rows 1000000]
+
+append() の時間はUIのスレッドが待つ時間（キューに積むだけ）で、
+ディスクへの書き込みは flush() までの時間に現れる。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from history import CalcHistory, binary_text, function_text  # noqa: E402
+
+OPS = ["+", "-", "*", "/", "^"]
+FUNCS = ["sqrt", "sin", "cos", "log", "%"]
+
+
+def make_entries(n):
+    rng = random.Random(0)
+    for _ in range(n):
+        a = rng.randint(0, 9999) / 10
+        if rng.random() < 0.2:
+            yield function_text(rng.choice(FUNCS), a), "0"
+        else:
+            yield binary_text(a, rng.choice(OPS), rng.randint(1, 9)), "0"
+
+
+def timed(label, fn, count=1, unit="op"):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36}{elapsed * 1e6 / count:>12.1f} us/{unit}")
+    return result
+
+
+def run(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        history = CalcHistory(os.path.join(tmp, "history.db"))
+        sessions = [history.start_session() for _ in range(10)]
+        entries = list(make_entries(rows))
+
+        def append_all():
+            for i, (expr, result) in enumerate(entries):
+                history.append(sessions[i % len(sessions)], expr, result)
+
+        start = time.perf_counter()
+        timed("append (UI thread)", append_all, rows, "row")
+        history.flush()
+        print(f"{'flush -> committed':<36}{rows / (time.perf_counter() - start):>12,.0f} rows/s")
+
+        first = timed("recent (first page of 50)", lambda: history.recent(50))
+        timed("recent (next page)", lambda: history.recent(50, before=first[-1][0]))
+        timed("recent (one session, first page)", lambda: history.recent(50, session_id=sessions[3]))
+        timed("search 'sqrt(12' (first page)", lambda: history.search("sqrt(12", 50))
+        timed("search '99' (first page)", lambda: history.search("99", 50))
+        count = rows // len(sessions)
+        timed("replay one session", lambda: sum(1 for _ in history.replay(sessions[0])), count, "row")
+        history.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.rows)
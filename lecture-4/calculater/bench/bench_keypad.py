@@ -0,0 +1,63 @@
+"""電卓の組み立てとキー入力の処理時間を計測（画面は表示しない。要 flet）
+
+    python bench/bench_keypad.py [--instances 200] [--presses 100000]
+
+組み立ては CalculatorApp() 1個あたり、キー入力は button_clicked() 1回あたりの時間。
+update() は画面への送信なので計測から外す。
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import flet as ft  # noqa: E402
+
+ft.app = lambda *args, **kwargs: None  # main.py の import でアプリを起動しない
+import main  # noqa: E402
+
+# 四則演算・関数・エラーからの復帰を一通り含むキー列
+KEYS = list("12+34*5=") + ["sqrt", "+/-", "^", "2", "=", "sin", "π", "/", "0", "=", "7", "AC"]
+
+
+def build(instances):
+    return [main.CalculatorApp() for _ in range(instances)]
+
+
+def run(instances, presses):
+    start = time.perf_counter()
+    build(instances)
+    elapsed = time.perf_counter() - start
+    print(f"{'CalculatorApp()':<28}{elapsed * 1e3 / instances:>10.3f} ms/instance")
+
+    start = time.perf_counter()
+    for _ in range(instances):
+        main.build_keypad(print)
+    elapsed = time.perf_counter() - start
+    print(f"{'build_keypad() only':<28}{elapsed * 1e3 / instances:>10.3f} ms/instance")
+
+    apps = build(2)
+    styles = {id(button.style) for app in apps
+              for row in app.content.controls[2:] for button in row.controls}
+    print(f"{'distinct ButtonStyle objects':<28}{len(styles):>10} (2 instances)")
+
+    app = apps[0]
+    app.update = lambda: None
+    events = [SimpleNamespace(control=SimpleNamespace(data=key)) for key in KEYS]
+    rounds = max(1, presses // len(events))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for event in events:
+            app.button_clicked(event)
+    elapsed = time.perf_counter() - start
+    print(f"{'button_clicked()':<28}{elapsed * 1e6 / (rounds * len(events)):>10.3f} us/press")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instances", type=int, default=200)
+    parser.add_argument("--presses", type=int, default=100_000)
+    args = parser.parse_args()
+    run(args.instances, args.presses)
@@ -0,0 +1,71 @@
+"""数値バックエンドごとの計算速度と誤差を比較
+
+電卓のボタン操作と同じ「2項演算 → 表示」の繰り返しを乱数の列で計測する。
+誤差は、同じ列を FractionBackend で厳密に計算した値との差。
+
+    python bench/bench_numeric.py [--steps 20000] [--precision 28 50 100]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from fractions import Fraction
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from expression import CalcError  # noqa: E402
+from numeric import DecimalBackend, FloatBackend, FractionBackend  # noqa: E402
+
+OPS = ["+", "-", "*", "/"]
+
+
+def make_steps(n):
+    rng = random.Random(0)
+    return [(rng.choice(OPS), f"{rng.randint(1, 999)}.{rng.randint(0, 99):02d}") for _ in range(n)]
+
+
+def run_chain(backend, steps):
+    """1ステップごとに表示用の文字列まで作る（電卓の = と同じ仕事）"""
+    parse, ops, fmt = backend.parse, backend.binary_ops, backend.format
+    value = parse("1")
+    for op, text in steps:
+        try:
+            value = ops[op](value, parse(text))
+        except CalcError:
+            continue
+        # 分数は掛け算・割り算が続くと分母が巨大になるので、電卓の表示と同じく
+        # 範囲外になったら値をリセットする
+        if abs(value) > 10**12 or 0 < abs(value) < 10**-12:
+            value = parse("1")
+        fmt(value)
+    return value
+
+
+def run(steps_count, precisions):
+    steps = make_steps(steps_count)
+    backends = [FloatBackend()] + [DecimalBackend(p) for p in precisions] + [FractionBackend()]
+    exact = None
+    results = []
+    for backend in backends:
+        start = time.perf_counter()
+        value = run_chain(backend, steps)
+        elapsed = time.perf_counter() - start
+        label = backend.name + (f" (prec={backend.precision})" if backend.name == "decimal" else "")
+        results.append((label, elapsed, value))
+        if backend.name == "fraction":
+            exact = value
+    fast = results[0][1]
+    print(f"{steps_count:,} operations + display formatting")
+    print(f"{'backend':<22}{'ops/s':>14}{'vs float':>10}{'relative error':>18}")
+    for label, elapsed, value in results:
+        error = abs(Fraction(value) - exact) / abs(exact) if exact else 0
+        print(f"{label:<22}{steps_count / elapsed:>14,.0f}{elapsed / fast:>9.1f}x{float(error):>18.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=20_000)
+    parser.add_argument("--precision", type=int, nargs="+", default=[28, 50, 100])
+    args = parser.parse_args()
+    run(args.steps, args.precision)
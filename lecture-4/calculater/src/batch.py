@@ -0,0 +1,89 @@
+"""式を NumPy 配列に対してまとめて評価するバッチモード
+
+    import numpy as np
+    from batch import evaluate_batch
+
+    x = np.linspace(-10, 10, 1_000_000)
+    y = evaluate_batch("sqrt(x) + 1 / x", x=x)    # "Error" になる要素は NaN
+    evaluate_batch("masked * 2", {"masked": x})   # 変数は dict でも渡せる
+
+expression.py と同じ構文木を、演算の表を NumPy に差し替えた compile_tree で変換し、
+全要素を1回で計算する。
+電卓で "Error" になる要素（0での割り算・負の数の sqrt・0以下の log・
+90°の tan・オーバーフロー）は例外にせず NaN にする。masked=True を指定すると
+NaN の代わりにマスクされた配列 (numpy.ma) を返す。
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from expression import CACHE_SIZE, compile_tree, parse, variables
+
+
+def _div(a, b):
+    return np.where(b == 0, np.nan, a / np.where(b == 0, 1, b))
+
+
+def _sqrt(x):
+    return np.where(x < 0, np.nan, np.sqrt(np.abs(x)))
+
+
+def _log(x):
+    return np.where(x <= 0, np.nan, np.log10(np.where(x <= 0, 1, x)))
+
+
+def _tan(x):
+    angle_deg = np.mod(x, 180)
+    undefined = np.abs(angle_deg - 90) < 1e-9
+    return np.where(undefined, np.nan, np.tan(np.radians(x)))
+
+
+BINARY_OPS = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": _div,
+    "^": np.power,
+}
+FUNCTIONS = {
+    "sqrt": _sqrt,
+    "sin": lambda x: np.sin(np.radians(x)),
+    "cos": lambda x: np.cos(np.radians(x)),
+    "tan": _tan,
+    "log": _log,
+    "+/-": np.negative,
+    "%": lambda x: np.divide(x, 100),
+}
+
+
+class BatchExpression:
+    """NumPy 用に変換済みの式。expr(x=...) か expr({"x": ...}) で評価する"""
+
+    __slots__ = ("text", "variables", "_fn")
+
+    def __init__(self, text):
+        ast = parse(text)
+        self.text = text
+        self.variables = frozenset(variables(ast))
+        self._fn = compile_tree(ast, BINARY_OPS, FUNCTIONS)
+
+    def __call__(self, arrays=None, /, *, masked=False, **kwargs):
+        """arrays（変数名 -> 配列）と kwargs の変数で評価する。masked という名前の変数は arrays で渡す"""
+        env = {name: np.asarray(value, dtype=np.float64) for name, value in {**(arrays or {}), **kwargs}.items()}
+        shape = np.broadcast_shapes(*(a.shape for a in env.values())) if env else ()
+        with np.errstate(all="ignore"):
+            result = np.broadcast_to(np.asarray(self._fn(env), dtype=np.float64), shape).copy()
+        # オーバーフロー (inf) や負の数の小数乗 (nan) も電卓と同じく "Error" 扱い
+        result[~np.isfinite(result)] = np.nan
+        return np.ma.masked_invalid(result) if masked else result
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_batch(text):
+    """式を NumPy 用に変換する（結果はLRUキャッシュされる）"""
+    return BatchExpression(text)
+
+
+def evaluate_batch(text, arrays=None, /, *, masked=False, **kwargs):
+    """式を配列の各要素について評価する。"Error" の要素は NaN（masked=True ならマスク）"""
+    return compile_batch(text)(arrays, masked=masked, **kwargs)
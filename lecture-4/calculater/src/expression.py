@@ -0,0 +1,301 @@
+"""電卓の式を評価するエンジン（Fletに依存しないので単体でも使える）
+
+    evaluate("1 + 2 * 3")            # 7.0
+    evaluate("sqrt(x) ^ 2", x=2.0)   # 変数も使える
+    expr = compile_expression("sin(a) + cos(a)")
+    expr(a=30)
+
+式の文字列はトークンに分解し、Pratt法で構文木にしてから Python のクロージャに
+変換する。変換結果は LRU キャッシュに保存されるので、同じ式は2回目から解析しない。
+
+演算子の優先順位: ( ) > 関数 > %（後置）> ^（右結合）> 単項 - > * / > + -
+関数: sqrt, sin, cos, tan（角度は度）, log（常用対数）  定数: π (pi), e
+"""
+import math
+import re
+from functools import lru_cache
+
+CACHE_SIZE = 256
+
+
+class CalcError(ValueError):
+    """式の誤りや、0での割り算など定義域の外の計算"""
+
+
+# --- 定義域のチェックつきの演算（電卓の "Error" と同じ規則） ---
+def div(a, b):
+    if b == 0:
+        raise CalcError("division by zero")
+    return a / b
+
+
+def power(a, b):
+    try:
+        return math.pow(a, b)
+    except (OverflowError, ValueError) as ex:
+        raise CalcError(str(ex)) from ex
+
+
+def sqrt(x):
+    if x < 0:
+        raise CalcError("sqrt of negative number")
+    return math.sqrt(x)
+
+
+def log(x):
+    if x <= 0:
+        raise CalcError("log of non-positive number")
+    return math.log10(x)
+
+
+def sin(x):
+    return math.sin(math.radians(x))
+
+
+def cos(x):
+    return math.cos(math.radians(x))
+
+
+def tan(x):
+    angle_deg = x % 180
+    if abs(angle_deg - 90) < 1e-9 or abs(angle_deg + 90) < 1e-9:
+        raise CalcError("tan is undefined at 90 degrees")
+    return math.tan(math.radians(x))
+
+
+BINARY_OPS = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": div,
+    "^": power,
+}
+FUNCTIONS = {"sqrt": sqrt, "sin": sin, "cos": cos, "tan": tan, "log": log}
+# 単項の - と後置の %（電卓のキーと同じ名前。compile_tree の functions にはこれも含める）
+UNARY_OPS = {"+/-": lambda x: -x, "%": lambda x: x / 100}
+CONSTANTS = {"π": math.pi, "pi": math.pi, "e": math.e}
+
+
+# --- 字句解析 ---
+_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?) |
+    (?P<name>π|[A-Za-z_][A-Za-z0-9_]*) |
+    (?P<op>\*\*|[-+*/^%(),×÷−])
+)""", re.VERBOSE)
+# 画面表示の記号も受け付ける
+_OP_ALIASES = {"**": "^", "×": "*", "÷": "/", "−": "-"}
+
+
+def tokenize(text, number=float):
+    """式を (種類, 値) のトークンのリストに分解する（数値は number(文字列) に変換する）"""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if m is None:
+            raise CalcError(f"unexpected character {text[pos:].lstrip()[:1]!r} at {pos}")
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "num":
+            tokens.append(("num", number(value)))
+        elif kind == "op":
+            tokens.append(("op", _OP_ALIASES.get(value, value)))
+        else:
+            tokens.append((kind, value))
+        pos = m.end()
+    tokens.append(("end", None))
+    return tokens
+
+
+# --- 構文解析（Pratt法）---
+# 構文木はタプル: ("num", v) ("var", name) ("neg", x) ("pct", x) ("bin", op, a, b) ("call", fn, x)
+_INFIX = {"+": (10, 11), "-": (10, 11), "*": (20, 21), "/": (20, 21), "^": (41, 40)}
+_PREFIX_BP = 30
+_POSTFIX_BP = 50
+
+
+class _Parser:
+    def __init__(self, tokens, constants=CONSTANTS):
+        self.tokens = tokens
+        self.constants = constants
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        token = self.next()
+        if token != ("op", value):
+            raise CalcError(f"expected {value!r}, got {token[1]!r}")
+
+    def parse(self):
+        node = self.expr(0)
+        if self.peek()[0] != "end":
+            raise CalcError(f"unexpected {self.peek()[1]!r}")
+        return node
+
+    def expr(self, min_bp):
+        left = self.prefix()
+        while True:
+            kind, value = self.peek()
+            if kind != "op":
+                break
+            if value == "%":
+                if _POSTFIX_BP < min_bp:
+                    break
+                self.next()
+                left = ("pct", left)
+                continue
+            if value not in _INFIX:
+                break
+            left_bp, right_bp = _INFIX[value]
+            if left_bp < min_bp:
+                break
+            self.next()
+            left = ("bin", value, left, self.expr(right_bp))
+        return left
+
+    def prefix(self):
+        kind, value = self.next()
+        if kind == "num":
+            return ("num", value)
+        if kind == "name":
+            if value in FUNCTIONS:
+                self.expect("(")
+                arg = self.expr(0)
+                self.expect(")")
+                return ("call", value, arg)
+            if value in self.constants:
+                return ("num", self.constants[value])
+            return ("var", value)
+        if (kind, value) == ("op", "("):
+            node = self.expr(0)
+            self.expect(")")
+            return node
+        if (kind, value) == ("op", "-"):
+            return ("neg", self.expr(_PREFIX_BP))
+        if (kind, value) == ("op", "+"):
+            return self.expr(_PREFIX_BP)
+        raise CalcError("unexpected end of expression" if kind == "end" else f"unexpected {value!r}")
+
+
+def parse(text, number=float, constants=CONSTANTS):
+    """式の文字列を構文木に変換する（number と constants で数値の型を変えられる。numeric.evaluate を参照）"""
+    return _Parser(tokenize(text, number), constants).parse()
+
+
+def variables(node):
+    """構文木に含まれる変数名の集合"""
+    kind = node[0]
+    if kind == "var":
+        return {node[1]}
+    if kind == "bin":
+        return variables(node[2]) | variables(node[3])
+    if kind in ("neg", "pct"):
+        return variables(node[1])
+    if kind == "call":
+        return variables(node[2])
+    return set()
+
+
+# --- クロージャへの変換 ---
+_FLOAT_FUNCTIONS = {**FUNCTIONS, **UNARY_OPS}
+
+
+def compile_tree(node, binary_ops=BINARY_OPS, functions=_FLOAT_FUNCTIONS):
+    """構文木を、変数の dict を受け取って値を返す関数に変換する
+
+    演算は binary_ops（+ - * / ^）と functions（sqrt などの関数と UNARY_OPS の "+/-" / "%"）
+    の表から引く。表を差し替えれば decimal / fraction（numeric.py）や NumPy 配列（batch.py）
+    の計算にも同じ変換を使える。
+    """
+    def build(node):
+        kind = node[0]
+        if kind == "num":
+            value = node[1]
+            return lambda env: value
+        if kind == "var":
+            name = node[1]
+
+            def load(env):
+                try:
+                    return env[name]
+                except KeyError:
+                    raise CalcError(f"undefined variable {name!r}") from None
+            return load
+        if kind in ("neg", "pct"):
+            fn, operand = functions["+/-" if kind == "neg" else "%"], build(node[1])
+            return lambda env: fn(operand(env))
+        if kind == "call":
+            fn, arg = functions[node[1]], build(node[2])
+            return lambda env: fn(arg(env))
+        op, left, right = binary_ops[node[1]], build(node[2]), build(node[3])
+        return lambda env: op(left(env), right(env))
+    return build(node)
+
+
+def _fold(node):
+    """定数だけの部分式を前もって計算しておく（エラーになる式はそのまま残す）"""
+    kind = node[0]
+    if kind in ("num", "var"):
+        return node
+    if kind == "bin":
+        node = ("bin", node[1], _fold(node[2]), _fold(node[3]))
+        children = node[2:]
+    elif kind == "call":
+        node = ("call", node[1], _fold(node[2]))
+        children = node[2:]
+    else:
+        node = (kind, _fold(node[1]))
+        children = node[1:]
+    if all(child[0] == "num" for child in children):
+        try:
+            return ("num", compile_tree(node)({}))
+        except (CalcError, OverflowError, ZeroDivisionError, ValueError):
+            # 評価時と同じエラーになるよう、畳み込まずに残す
+            pass
+    return node
+
+
+class CompiledExpression:
+    """解析・変換済みの式。expr(**variables) で評価する"""
+
+    __slots__ = ("text", "ast", "variables", "_fn")
+
+    def __init__(self, text, ast):
+        self.text = text
+        self.ast = ast
+        self.variables = frozenset(variables(ast))
+        self._fn = compile_tree(ast)
+
+    def __call__(self, /, **env):
+        try:
+            return self._fn(env)
+        except CalcError:
+            raise
+        except (OverflowError, ZeroDivisionError, ValueError) as ex:   # ValueError: math domain error
+            raise CalcError(str(ex)) from ex
+
+    def __repr__(self):
+        return f"CompiledExpression({self.text!r})"
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(text):
+    """式を解析してクロージャに変換する（結果はLRUキャッシュされる）"""
+    return CompiledExpression(text, _fold(parse(text)))
+
+
+def evaluate(text, /, **env):
+    """式の文字列を評価して float を返す。エラーは CalcError"""
+    return compile_expression(text)(**env)
+
+
+def cache_info():
+    return compile_expression.cache_info()
@@ -0,0 +1,263 @@
+"""電卓の計算履歴を SQLite に保存する
+
+    history = CalcHistory()                  # calc_history.db
+    session = history.start_session("float")
+    history.append(session, "1 + 2", "3")    # 待たずに戻る（書き込みは専用スレッド）
+    history.recent(limit=20)                 # 新しい順に20件
+    history.search("sqrt(", limit=20)        # 式の先頭一致
+    for entry_id, expr, old, new in history.replay(session):
+        ...                                  # 記録したバックエンドで計算し直す
+
+append() はキューに積むだけで、専用スレッドがまとめて executemany し1回でコミット
+する（UIのスレッドはディスクを待たない）。読み込みは別の接続から行う（WAL）。
+一覧はどれも limit 件ずつのページで返し、続きは最後の行の id を before / after に渡す。
+"""
+import math
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from fractions import Fraction
+
+import expression
+import numeric
+
+HISTORY_DB_NAME = "calc_history.db"
+PAGE_SIZE = 50
+WRITE_BATCH_SIZE = 256
+# 履歴に厳密な値のまま書く分数の最大の桁数（これより長いものは電卓の表示の形式で書く）
+MAX_OPERAND_DIGITS = 40
+_format_fraction = numeric.FractionBackend().format
+
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+]
+_STOP = object()
+
+
+def connect(db_name):
+    conn = sqlite3.connect(db_name, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def init_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    backend TEXT,
+                    started_at TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id INTEGER REFERENCES sessions (id),
+                    expression TEXT,
+                    result TEXT,
+                    created_at TEXT)''')
+    # セッションごとの新しい順 / 式の先頭一致の検索用
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_session ON entries (session_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_expression ON entries (expression)")
+    conn.commit()
+
+
+def _prefix_range(prefix):
+    """先頭一致を、インデックスが使える範囲の条件 [prefix, upper) にする"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _digits(value):
+    """分数の分子・分母の大きい方のおおよその桁数（str() せずに求める）"""
+    return max(abs(value.numerator), value.denominator).bit_length() * math.log10(2)
+
+
+def operand_text(value, paren=True):
+    """数値を expression.py で読み直せる文字列にする（負の数と分数は括弧で囲む）
+
+    10 ^ 4096 のような桁の大きい分数は str() が失敗する（4300桁を超えると ValueError）うえ
+    履歴も大きくなるので、MAX_OPERAND_DIGITS を超えたら表示の形式（有効12桁）で書く。
+    """
+    if isinstance(value, Fraction) and _digits(value) > MAX_OPERAND_DIGITS:
+        text = _format_fraction(value)
+    else:
+        text = repr(value) if isinstance(value, float) else str(value)
+    if text.endswith(".0"):
+        text = text[:-2]
+    return f"({text})" if paren and (text.startswith("-") or "/" in text) else text
+
+
+def binary_text(a, op, b):
+    return f"{operand_text(a)} {op} {operand_text(b)}"
+
+
+def function_text(name, value):
+    return f"{operand_text(value)}%" if name == "%" else f"{name}({operand_text(value, paren=False)})"
+
+
+# --- 書き込み専用スレッド ---
+class HistoryWriter:
+    """履歴の行をキューに溜め、専用スレッドがまとめて書き込む"""
+
+    def __init__(self, conn, batch_size=WRITE_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="CalcHistory-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, row):
+        """entries の1行を積む（待たない）"""
+        self._queue.put(row)
+
+    def submit(self, fn):
+        """fn(cur) を書き込みスレッドで実行する。結果は Future で返す"""
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def flush(self):
+        """それまでに積んだ行がすべてコミットされるまで待つ"""
+        self.submit(lambda cur: None).result()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch.remove(_STOP)
+            jobs = [item for item in batch if isinstance(item[-1], Future)]
+            rows = [item for item in batch if not isinstance(item[-1], Future)]
+            self._commit(rows, jobs)
+
+    def _commit(self, rows, jobs):
+        cur = self.conn.cursor()
+        try:
+            cur.executemany('''INSERT INTO entries (session_id, expression, result, created_at)
+                               VALUES (?, ?, ?, ?)''', rows)
+            results = [fn(cur) for fn, _ in jobs]
+            self.conn.commit()
+        except Exception as ex:
+            self.conn.rollback()
+            for _, future in jobs:
+                future.set_exception(ex)
+            return
+        for (_, future), result in zip(jobs, results):
+            future.set_result(result)
+
+
+# --- 履歴の管理クラス ---
+class CalcHistory:
+    def __init__(self, db_name=HISTORY_DB_NAME):
+        self.conn = connect(db_name)
+        init_tables(self.conn)
+        # :memory: は接続ごとに別DBになるので書き込みも同じ接続で行う
+        self.writer = HistoryWriter(self.conn if db_name == ":memory:" else connect(db_name))
+
+    def start_session(self, backend="float"):
+        """新しいセッションを作って id を返す（電卓を開くたびに1回）"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        def job(cur):
+            cur.execute("INSERT INTO sessions (backend, started_at) VALUES (?, ?)", (backend, now))
+            return cur.lastrowid
+
+        return self.writer.submit(job).result()
+
+    def append(self, session_id, expr, result):
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.writer.put((session_id, expr, result, now))
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+        if self.writer.conn is not self.conn:
+            self.writer.conn.close()
+        self.conn.close()
+
+    def _page(self, table, clauses, params, order, limit):
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        cur = self.conn.cursor()
+        cur.execute(f"SELECT * FROM {table} {where} ORDER BY id {order} LIMIT ?", (*params, limit))
+        return cur.fetchall()
+
+    def recent(self, limit=PAGE_SIZE, before=None, session_id=None):
+        """履歴を新しい順に limit 件（続きは最後の行の id を before に渡す）
+
+        行は (id, session_id, expression, result, created_at)
+        """
+        clauses, params = [], []
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if before is not None:
+            clauses.append("id < ?")
+            params.append(before)
+        return self._page("entries", clauses, params, "DESC", limit)
+
+    def search(self, prefix, limit=PAGE_SIZE, before=None):
+        """式が prefix で始まる履歴を新しい順に limit 件"""
+        if not prefix:
+            return self.recent(limit, before)
+        low, high = _prefix_range(prefix)
+        clauses, params = ["expression >= ?", "expression < ?"], [low, high]
+        if before is not None:
+            clauses.append("id < ?")
+            params.append(before)
+        return self._page("entries", clauses, params, "DESC", limit)
+
+    def sessions(self, limit=PAGE_SIZE, before=None):
+        """セッションを新しい順に limit 件。行は (id, backend, started_at)"""
+        clauses, params = ([], []) if before is None else (["id < ?"], [before])
+        return self._page("sessions", clauses, params, "DESC", limit)
+
+    def session_entries(self, session_id, limit=PAGE_SIZE, after=None):
+        """1セッションの履歴を古い順に limit 件（続きは最後の行の id を after に渡す）"""
+        return self._page("entries", ["session_id = ?", "id > ?"], [session_id, after or 0], "ASC", limit)
+
+    def session_backend(self, session_id):
+        """セッションを記録したときのバックエンド名（無ければ None）"""
+        row = self.conn.execute("SELECT backend FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row and row[0]
+
+    def replay(self, session_id, evaluate=None, fmt=None, page_size=500):
+        """保存したセッションの式を順に計算し直す
+
+        (id, expression, 保存した結果, 計算し直した結果) を1件ずつ返す。
+        evaluate / fmt を省略すると、そのセッションを記録したバックエンド（float / decimal /
+        fraction）で計算・表示する。履歴はページ単位で読み込むので、長いセッションでも
+        全件をメモリに載せない。
+        """
+        self.flush()
+        if evaluate is None or fmt is None:
+            backend = numeric.make_backend(self.session_backend(session_id) or "float")
+            if evaluate is None:
+                # float は式エンジンのキャッシュ付きの評価をそのまま使う（結果は同じ）
+                evaluate = (expression.evaluate if backend.name == "float"
+                            else lambda text: numeric.evaluate(text, backend))
+            fmt = fmt or backend.format
+        after = None
+        while True:
+            rows = self.session_entries(session_id, page_size, after)
+            for entry_id, _, expr, result, _ in rows:
+                try:
+                    new = fmt(evaluate(expr))
+                except ValueError:   # CalcError と、math の定義域エラーなど
+                    new = "Error"
+                yield entry_id, expr, result, new
+            if len(rows) < page_size:
+                return
+            after = rows[-1][0]
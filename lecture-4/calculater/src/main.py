@@ -1,7 +1,17 @@
 import flet as ft
-import math 
+import os
+import threading
+
+from expression import CalcError
+from history import CalcHistory, binary_text, function_text
+from numeric import FloatBackend, make_backend
 
 # --- 1. カスタムボタンクラス ---
+# ボタンの形は全ボタン・全インスタンスで1つのオブジェクトを共有する（変更しないこと）
+BUTTON_STYLE = ft.ButtonStyle(
+    shape=ft.RoundedRectangleBorder(radius=ft.border_radius.all(30)),
+)
+
 class CalcButton(ft.ElevatedButton):
     def __init__(self, text, button_clicked, expand=1):
         super().__init__()
@@ -9,9 +19,7 @@ class CalcButton(ft.ElevatedButton):
         self.expand = expand
         self.on_click = button_clicked
         self.data = text
-        self.style = ft.ButtonStyle(
-            shape=ft.RoundedRectangleBorder(radius=ft.border_radius.all(30)),
-        )
+        self.style = BUTTON_STYLE
         self.height = 70
 
 class DigitButton(CalcButton):
@@ -34,10 +42,37 @@ class ExtraActionButton(CalcButton):
         self.bgcolor = ft.Colors.BLUE_GREY_100
         self.color = ft.Colors.BLACK
 
-# --- 2. メインアプリクラス (変更なし) ---
+# --- キー配列 ---
+# 1行ごとに (キー, ボタンの種類, expand)。ボタンはこの表から組み立てる
+KEYPAD = (
+    (("AC", ExtraActionButton, 1), ("sqrt", ExtraActionButton, 1), ("+/-", ExtraActionButton, 1),
+     ("^", ActionButton, 1)),
+    (("sin", ExtraActionButton, 1), ("cos", ExtraActionButton, 1), ("tan", ExtraActionButton, 1),
+     ("log", ExtraActionButton, 1), ("π", ExtraActionButton, 1), ("e", ExtraActionButton, 1)),
+    (("7", DigitButton, 1), ("8", DigitButton, 1), ("9", DigitButton, 1), ("/", ActionButton, 1)),
+    (("4", DigitButton, 1), ("5", DigitButton, 1), ("6", DigitButton, 1), ("*", ActionButton, 1)),
+    (("1", DigitButton, 1), ("2", DigitButton, 1), ("3", DigitButton, 1), ("-", ActionButton, 1)),
+    (("0", DigitButton, 2), (".", DigitButton, 1), ("+", ActionButton, 1), ("=", ActionButton, 1)),
+)
+
+def build_keypad(on_click, layout=KEYPAD):
+    """キー配列の表からボタンの行 (ft.Row) のリストを作る"""
+    return [
+        ft.Row(controls=[button(text=key, button_clicked=on_click, expand=expand)
+                         for key, button, expand in row])
+        for row in layout
+    ]
+
+# --- 2. メインアプリクラス ---
 class CalculatorApp(ft.Container):
-    def __init__(self):
+    def __init__(self, backend=None, history=None):
         super().__init__()
+        # 数値の種類（float / decimal / fraction）は電卓ごとに選べる。既定は float
+        self.backend = backend or FloatBackend()
+        self._shown = None
+        # 計算履歴（CalcHistory）。None なら保存しない
+        self.history = history
+        self.session_id = history.start_session(self.backend.name) if history else None
         self.reset()
 
         self.result = ft.Text(value="0", color=ft.Colors.WHITE, size=48, weight=ft.FontWeight.W_200) 
@@ -49,247 +84,193 @@ class CalculatorApp(ft.Container):
             controls=[
                 ft.Row(controls=[self.result], alignment=ft.MainAxisAlignment.END), 
                 ft.Divider(height=1, color=ft.Colors.WHITE24),
-                
-                # Row 1 (AC, sqrt, +/-, ^)
-                ft.Row(
-                    controls=[
-                        ExtraActionButton(text="AC", button_clicked=self.button_clicked),
-                        ExtraActionButton(text="sqrt", button_clicked=self.button_clicked), 
-                        ExtraActionButton(text="+/-", button_clicked=self.button_clicked),
-                        ActionButton(text="^", button_clicked=self.button_clicked), 
-                    ]
-                ),
-                # Row 2 (sin, cos, tan, log, pi, e) - 6ボタン
-                ft.Row(
-                    controls=[
-                        # expand=1 が正しく渡されるようになりました
-                        ExtraActionButton(text="sin", button_clicked=self.button_clicked, expand=1), 
-                        ExtraActionButton(text="cos", button_clicked=self.button_clicked, expand=1), 
-                        ExtraActionButton(text="tan", button_clicked=self.button_clicked, expand=1), 
-                        ExtraActionButton(text="log", button_clicked=self.button_clicked, expand=1), 
-                        ExtraActionButton(text="π", button_clicked=self.button_clicked, expand=1), 
-                        ExtraActionButton(text="e", button_clicked=self.button_clicked, expand=1), 
-                    ]
-                ),
-                # Row 3 (7, 8, 9, /)
-                ft.Row(
-                    controls=[
-                        DigitButton(text="7", button_clicked=self.button_clicked),
-                        DigitButton(text="8", button_clicked=self.button_clicked),
-                        DigitButton(text="9", button_clicked=self.button_clicked),
-                        ActionButton(text="/", button_clicked=self.button_clicked), 
-                    ]
-                ),
-                # Row 4 (4, 5, 6, *)
-                ft.Row(
-                    controls=[
-                        DigitButton(text="4", button_clicked=self.button_clicked),
-                        DigitButton(text="5", button_clicked=self.button_clicked),
-                        DigitButton(text="6", button_clicked=self.button_clicked),
-                        ActionButton(text="*", button_clicked=self.button_clicked),
-                    ]
-                ),
-                # Row 5 (1, 2, 3, -)
-                ft.Row(
-                    controls=[
-                        DigitButton(text="1", button_clicked=self.button_clicked),
-                        DigitButton(text="2", button_clicked=self.button_clicked),
-                        DigitButton(text="3", button_clicked=self.button_clicked),
-                        ActionButton(text="-", button_clicked=self.button_clicked),
-                    ]
-                ),
-                # Row 6 (0, ., +, =)
-                ft.Row(
-                    controls=[
-                        DigitButton(text="0", expand=2, button_clicked=self.button_clicked),
-                        DigitButton(text=".", button_clicked=self.button_clicked),
-                        ActionButton(text="+", button_clicked=self.button_clicked),
-                        ActionButton(text="=", button_clicked=self.button_clicked),
-                    ]
-                ),
+                *build_keypad(self.button_clicked),
             ],
             spacing=10
         )
 
-    # ロジックメソッド (button_clicked, format_number, calculate) は変更なし
+    # ロジックメソッド（キーごとの処理は input_* に分け、KEY_HANDLERS で振り分ける）
     def reset(self):
         self.operator = "+"
         self.operand1 = 0.0
         self.new_operand = True
         self.pending_op = False 
 
+    def show(self, value):
+        self.result.value = str(self.format_number(value))
+        if self.backend.exact:
+            # 表示は丸められることがあるので、値そのものを覚えておく
+            self._shown = (self.result.value, value)
+
+    def read(self):
+        """表示中の数値（読めなければ CalcError）"""
+        if self._shown is not None and self._shown[0] == self.result.value:
+            return self._shown[1]
+        return self.backend.parse(self.result.value)
+
+    def record(self, describe, result):
+        """計算した式と結果を履歴に追加する（書き込みは待たない）
+
+        describe は式の文字列を返す関数。式の組み立てや履歴への追加に失敗しても
+        計算は止めない（履歴には残らない）。
+        """
+        if self.history is None:
+            return
+        try:
+            self.history.append(self.session_id, describe(), str(self.format_number(result)))
+        except Exception:
+            pass
+
+    def apply_function(self, name, value):
+        try:
+            result = self.backend.functions[name](value)
+        except CalcError:
+            self.record(lambda: function_text(name, value), "Error")
+            raise
+        if name != "+/-":
+            self.record(lambda: function_text(name, value), result)
+        return result
+
     def button_clicked(self, e):
         data = e.control.data
-        
+
         if self.result.value == "Error" or data == "AC":
             self.result.value = "0"
             self.reset()
-            self.update()
+        else:
+            # キー → 処理 の表で振り分ける（KEY_HANDLERS はクラスの下で定義）
+            handler = self.KEY_HANDLERS.get(data)
+            if handler is not None:
+                handler(self, data)
+
+        self.update()
+
+    def error(self):
+        self.result.value = "Error"
+        self.reset()
+
+    def input_digit(self, data):
+        if "e" in str(self.result.value).lower() and not self.new_operand:
+             self.result.value = "0" 
+             self.new_operand = True
+        
+        if data == "." and "." in str(self.result.value):
             return
-            
-        elif data in ("1", "2", "3", "4", "5", "6", "7", "8", "9", "0", "."):
-            if "e" in str(self.result.value).lower() and not self.new_operand:
-                 self.result.value = "0" 
-                 self.new_operand = True
-            
-            if data == "." and "." in str(self.result.value):
-                return
-
-            if self.result.value == "0" or self.new_operand:
-                if data == "." and self.result.value == "0":
-                    self.result.value = "0."
-                elif data == ".":
-                    self.result.value = "0."
-                else:
-                    self.result.value = data
-                self.new_operand = False
-            else:
-                self.result.value += data
-
-        elif data in ("π", "e"):
-            if data == "π":
-                value = math.pi
-            else: 
-                value = math.e
-                
-            self.result.value = str(self.format_number(value))
-            self.new_operand = True
-            
-        elif data in ("+", "-", "*", "/", "^"):
-            try:
-                current_value = float(self.result.value)
-            except ValueError:
-                self.result.value = "Error"
-                self.reset()
-                self.update()
-                return
-
-            if self.pending_op:
-                self.operand1 = self.calculate(self.operand1, current_value, self.operator)
-                self.result.value = str(self.format_number(self.operand1))
+
+        if self.result.value == "0" or self.new_operand:
+            if data == "." and self.result.value == "0":
+                self.result.value = "0."
+            elif data == ".":
+                self.result.value = "0."
             else:
-                self.operand1 = current_value
-                self.pending_op = True 
+                self.result.value = data
+            self.new_operand = False
+        else:
+            self.result.value += data
 
-            self.operator = data
-            self.new_operand = True 
+    def input_constant(self, data):
+        self.show(self.backend.constants[data])
+        self.new_operand = True
+
+    def input_operator(self, data):
+        try:
+            current_value = self.read()
+        except CalcError:
+            self.error()
+            return
+
+        if self.pending_op:
+            self.operand1 = self.calculate(self.operand1, current_value, self.operator)
+            self.show(self.operand1)
+        else:
+            self.operand1 = current_value
+            self.pending_op = True 
+
+        self.operator = data
+        self.new_operand = True 
+
+    def input_equals(self, data):
+        if not self.pending_op:
+            return
+        try:
+            operand2 = self.read()
+        except CalcError:
+            self.error()
+            return
+            
+        self.operand1 = self.calculate(self.operand1, operand2, self.operator)
         
-        elif data == "=":
-            if self.pending_op:
-                try:
-                    operand2 = float(self.result.value)
-                except ValueError:
-                    self.result.value = "Error"
-                    self.reset()
-                    self.update()
-                    return
-                    
-                self.operand1 = self.calculate(self.operand1, operand2, self.operator)
-                
-                if self.operand1 == "Error":
-                    self.result.value = "Error"
-                else:
-                    self.result.value = str(self.format_number(self.operand1))
-                
-                self.pending_op = False 
-                self.new_operand = True 
+        if self.operand1 == "Error":
+            self.result.value = "Error"
+        else:
+            self.show(self.operand1)
         
-        elif data in ("%", "+/-", "sqrt", "sin", "cos", "tan", "log"):
-            try:
-                current_value = float(self.result.value)
-                result = current_value
-
-                if data == "%":
-                    result = current_value / 100
-
-                elif data == "+/-":
-                    result = -current_value
-                
-                elif data == "sqrt":
-                    if current_value < 0:
-                        self.result.value = "Error"
-                        self.reset()
-                        self.update()
-                        return
-                    result = math.sqrt(current_value)
-                
-                elif data == "log":
-                    if current_value <= 0:
-                        self.result.value = "Error"
-                        self.reset()
-                        self.update()
-                        return
-                    result = math.log10(current_value)
-
-                elif data == "sin":
-                    result = math.sin(math.radians(current_value))
-                
-                elif data == "cos":
-                    result = math.cos(math.radians(current_value))
-
-                elif data == "tan":
-                    angle_deg = current_value % 180
-                    if abs(angle_deg - 90) < 1e-9 or abs(angle_deg + 90) < 1e-9: 
-                        self.result.value = "Error" 
-                        self.reset()
-                        self.update()
-                        return
-                    result = math.tan(math.radians(current_value))
-
-                self.result.value = str(self.format_number(result))
-                self.new_operand = True 
-            
-            except Exception:
-                self.result.value = "Error"
+        self.pending_op = False 
+        self.new_operand = True 
+
+    def input_function(self, data):
+        try:
+            current_value = self.read()
+            # %, +/-, sqrt, sin, cos, tan, log（定義域の外は CalcError）
+            result = self.apply_function(data, current_value)
+
+            self.show(result)
+            self.new_operand = True 
         
-        self.update()
+        except CalcError:
+            self.error()
+
+        except Exception:
+            self.result.value = "Error"
 
     def format_number(self, num):
         if num == "Error":
             return "Error"
-            
-        if not isinstance(num, (int, float)) or math.isinf(num) or math.isnan(num):
-             return "Error"
-
-        abs_num = abs(num)
-        
-        if (abs_num >= 10**10) or (0 < abs_num < 10**-6):
-            return f"{num:.8e}"
-        
-        if num == int(num):
-            if abs(int(num)) >= 10**10:
-                 return f"{num:.8e}"
-            return int(num)
-        
-        else:
-            num_str = f"{num:.10f}"
-            return float(num_str.rstrip('0').rstrip('.'))
+        # 表示の形式はバックエンドごと（numeric.py）
+        return self.backend.format(num)
 
     def calculate(self, operand1, operand2, operator):
+        # 演算と "Error" になる条件は式エンジン (expression.py) と共通
         try:
-            if operator == "+":
-                return operand1 + operand2
-            elif operator == "-":
-                return operand1 - operand2
-            elif operator == "*":
-                return operand1 * operand2
-            elif operator == "/":
-                if operand2 == 0:
-                    return "Error"
-                else:
-                    return operand1 / operand2
-            elif operator == "^": 
-                return math.pow(operand1, operand2)
+            result = self.backend.binary_ops[operator](operand1, operand2)
         except Exception:
-            return "Error"
+            result = "Error"
+        self.record(lambda: binary_text(operand1, operator, operand2), result)
+        return result
+
+
+# キー → 処理（CalculatorApp のメソッド）
+CalculatorApp.KEY_HANDLERS = {
+    **dict.fromkeys("0123456789.", CalculatorApp.input_digit),
+    **dict.fromkeys(("π", "e"), CalculatorApp.input_constant),
+    **dict.fromkeys(("+", "-", "*", "/", "^"), CalculatorApp.input_operator),
+    "=": CalculatorApp.input_equals,
+    **dict.fromkeys(("%", "+/-", "sqrt", "sin", "cos", "tan", "log"), CalculatorApp.input_function),
+}
 
 
 # --- 3. アプリケーションのエントリーポイント ---
+# 計算履歴は calc_history.db に保存する。書き込みスレッドと接続はプロセス内の全セッションで1つ
+# （最初のセッションが開いたときに作る。import しただけではファイルを作らない）
+_history = None
+_history_lock = threading.Lock()
+
+def shared_history():
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = CalcHistory()
+        return _history
+
 def main(page: ft.Page):
     page.title = "Scientific Calculator"
     page.theme_mode = ft.ThemeMode.DARK
     
-    calc = CalculatorApp()
+    history = shared_history()
+    # 閉じるときに書き込み待ちの分を反映する（履歴そのものは他のセッションが使い続ける）
+    page.on_disconnect = lambda e: history.flush()
+    # CALC_BACKEND=decimal / fraction で計算方法を切り替えられる
+    calc = CalculatorApp(make_backend(os.environ.get("CALC_BACKEND", "float")), history)
     page.add(calc)
 
 
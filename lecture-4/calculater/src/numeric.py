@@ -0,0 +1,295 @@
+"""電卓の数値バックエンド（float / decimal / fraction）
+
+    FloatBackend()          # 既定。binary float で最速（従来と同じ動作）
+    DecimalBackend(50)      # 10進の任意精度（有効桁数を指定）。0.1 + 0.2 = 0.3
+    FractionBackend()       # 分数で厳密に計算。1 / 3 * 3 = 1
+
+各バックエンドは同じ形をしている:
+    parse(text)          画面の文字列 → 数値（読めなければ CalcError）
+    binary_ops[op]       + - * / ^
+    functions[name]      sqrt sin cos tan log % +/-
+    constants[name]      π e
+    format(num)          数値 → 画面の文字列
+定義域の外（0での割り算など）はどれも CalcError にする。
+"""
+import decimal
+import math
+import operator
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+
+import expression
+from expression import CalcError
+
+# 画面に入りきらない数は指数表記にする（float の従来の表示と同じ境界）
+SCI_UPPER = 10**10
+SCI_LOWER = 10**-6
+
+
+def _format_float(num):
+    if not isinstance(num, (int, float)) or math.isinf(num) or math.isnan(num):
+        return "Error"
+
+    abs_num = abs(num)
+
+    if (abs_num >= SCI_UPPER) or (0 < abs_num < SCI_LOWER):
+        return f"{num:.8e}"
+
+    if num == int(num):
+        return str(int(num))
+
+    num_str = f"{num:.10f}"
+    return str(float(num_str.rstrip('0').rstrip('.')))
+
+
+class FloatBackend:
+    """binary float（math モジュール）。表示は小数点以下10桁で丸める"""
+
+    name = "float"
+    # 表示を文字列から読み直す（丸めた表示の値で次の計算をする従来の動作）
+    exact = False
+    binary_ops = expression.BINARY_OPS
+    functions = {**expression.FUNCTIONS, **expression.UNARY_OPS}
+    constants = {"π": math.pi, "e": math.e}
+
+    def parse(self, text):
+        try:
+            return float(text)
+        except ValueError:
+            raise CalcError(f"not a number: {text!r}") from None
+
+    def format(self, num):
+        return _format_float(num)
+
+
+# --- decimal ---
+def _checked(fn):
+    """decimal の例外（0での割り算・定義域の外・桁あふれ）を CalcError にする"""
+    def wrapper(*args):
+        try:
+            return fn(*args)
+        except decimal.DecimalException as ex:
+            raise CalcError(type(ex).__name__) from ex
+    return wrapper
+
+
+@lru_cache(maxsize=8)
+def _decimal_pi(prec):
+    """πを prec 桁で計算する（decimal モジュールのドキュメントのレシピ）"""
+    with decimal.localcontext(decimal.Context(prec=prec + 2)):
+        three = Decimal(3)
+        lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+        while s != lasts:
+            lasts = s
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            s += t
+    return decimal.Context(prec=prec).plus(s)
+
+
+def _taylor(x, i, s, num):
+    """sin / cos のテイラー展開を、値が変わらなくなるまで足す"""
+    lasts, fact, sign = 0, 1, 1
+    while s != lasts:
+        lasts = s
+        i += 2
+        fact *= i * (i - 1)
+        num *= x * x
+        sign *= -1
+        s += num / fact * sign
+    return s
+
+
+class DecimalBackend:
+    """10進の任意精度。sin / cos / tan も decimal のまま計算する"""
+
+    name = "decimal"
+    exact = True
+
+    def __init__(self, precision=28):
+        self.precision = precision
+        self.context = ctx = decimal.Context(prec=precision)
+        self.binary_ops = {
+            "+": _checked(ctx.add),
+            "-": _checked(ctx.subtract),
+            "*": _checked(ctx.multiply),
+            "/": _checked(ctx.divide),
+            "^": _checked(ctx.power),
+        }
+        self.functions = {
+            "sqrt": _checked(self.sqrt),
+            "sin": _checked(self.sin),
+            "cos": _checked(self.cos),
+            "tan": _checked(self.tan),
+            "log": _checked(self.log),
+            "%": _checked(lambda x: ctx.divide(x, 100)),
+            "+/-": _checked(ctx.minus),
+        }
+        self.constants = {"π": _decimal_pi(precision), "e": ctx.exp(1)}
+
+    def parse(self, text):
+        try:
+            return self.context.create_decimal(text)
+        except decimal.InvalidOperation:
+            raise CalcError(f"not a number: {text!r}") from None
+
+    def format(self, num):
+        if not isinstance(num, Decimal) or not num.is_finite():
+            return "Error"
+        abs_num = abs(num)
+        if (abs_num >= SCI_UPPER) or (0 < abs_num < SCI_LOWER):
+            return f"{num:.8e}"
+        return f"{num.normalize(self.context):f}"
+
+    def sqrt(self, x):
+        if x < 0:
+            raise CalcError("sqrt of negative number")
+        return self.context.sqrt(x)
+
+    def log(self, x):
+        if x <= 0:
+            raise CalcError("log of non-positive number")
+        return self.context.log10(x)
+
+    def _trig(self, x, cos):
+        # 余分な桁で計算してから丸める。精度より小さい値（cos(90) など）は 0
+        with decimal.localcontext(decimal.Context(prec=self.precision + 5)):
+            deg = x % 360
+            if deg > 180:
+                deg -= 360
+            elif deg < -180:
+                deg += 360
+            rad = deg * _decimal_pi(self.precision + 5) / 180
+            s = _taylor(rad, 0, Decimal(1), Decimal(1)) if cos else _taylor(rad, 1, rad, rad)
+        if s and s.adjusted() < -self.precision:
+            return Decimal(0)
+        return self.context.plus(s)
+
+    def sin(self, x):
+        return self._trig(x, cos=False)
+
+    def cos(self, x):
+        return self._trig(x, cos=True)
+
+    def tan(self, x):
+        angle_deg = x % 180
+        if abs(angle_deg - 90) < Decimal("1e-9") or abs(angle_deg + 90) < Decimal("1e-9"):
+            raise CalcError("tan is undefined at 90 degrees")
+        return self.context.divide(self.sin(x), self.cos(x))
+
+
+# --- fractions ---
+# これより大きい整数の指数は厳密に計算せず float に任せる（桁数が爆発するため）
+MAX_EXACT_EXPONENT = 4096
+# 無理数になる関数の結果は、分母がこれ以下の分数に丸める
+INEXACT_DENOMINATOR = 10**12
+# 分数の表示に使う桁数（分数が長すぎて表示できないときの小数表記）
+_FRACTION_DISPLAY = decimal.Context(prec=12)
+
+
+def _snap(x):
+    """float の結果を近い分数にする（sin(30) → 1/2）"""
+    return Fraction(x).limit_denominator(INEXACT_DENOMINATOR)
+
+
+def _inexact(fn):
+    def wrapper(x):
+        return _snap(fn(float(x)))
+    return wrapper
+
+
+def _fraction_div(a, b):
+    if b == 0:
+        raise CalcError("division by zero")
+    return a / b
+
+
+def _fraction_power(a, b):
+    if b.denominator == 1 and abs(b) <= MAX_EXACT_EXPONENT:
+        if a == 0 and b < 0:
+            raise CalcError("division by zero")
+        return a ** int(b)
+    return _snap(expression.power(float(a), float(b)))
+
+
+def _fraction_sqrt(x):
+    if x < 0:
+        raise CalcError("sqrt of negative number")
+    n, d = math.isqrt(x.numerator), math.isqrt(x.denominator)
+    if n * n == x.numerator and d * d == x.denominator:
+        return Fraction(n, d)
+    return _snap(math.sqrt(x))
+
+
+class FractionBackend:
+    """分数で厳密に計算する。sqrt / sin / log などの無理数は分数で近似する"""
+
+    name = "fraction"
+    exact = True
+    binary_ops = {
+        "+": operator.add,
+        "-": operator.sub,
+        "*": operator.mul,
+        "/": _fraction_div,
+        "^": _fraction_power,
+    }
+    functions = {
+        "sqrt": _fraction_sqrt,
+        "sin": _inexact(expression.sin),
+        "cos": _inexact(expression.cos),
+        "tan": _inexact(expression.tan),
+        "log": _inexact(expression.log),
+        "%": lambda x: x / 100,
+        "+/-": operator.neg,
+    }
+    constants = {"π": _snap(math.pi), "e": _snap(math.e)}
+
+    def parse(self, text):
+        try:
+            return Fraction(text)
+        except (ValueError, ZeroDivisionError):
+            raise CalcError(f"not a number: {text!r}") from None
+
+    def format(self, num):
+        if not isinstance(num, Fraction):
+            return "Error"
+        abs_num = abs(num)
+        if (abs_num >= SCI_UPPER) or (0 < abs_num < SCI_LOWER):
+            return f"{_FRACTION_DISPLAY.divide(num.numerator, num.denominator):.8e}"
+        if num.denominator == 1:
+            return str(num.numerator)
+        text = f"{num.numerator}/{num.denominator}"
+        if len(text) > 15:
+            # 長い分数は小数で表示する（値そのものは分数のまま保持される）
+            approx = _FRACTION_DISPLAY.divide(num.numerator, num.denominator)
+            return f"{approx.normalize(_FRACTION_DISPLAY):f}"
+        return text
+
+
+BACKENDS = {"float": FloatBackend, "decimal": DecimalBackend, "fraction": FractionBackend}
+
+
+def evaluate(text, backend):
+    """式を backend の数値で評価する（decimal / fraction の履歴を計算し直すときに使う）
+
+    数値は backend.parse で読むので 0.1 などが float を経由せずにそのまま入る。
+    キャッシュしないので、float で何度も評価するなら expression.evaluate を使う。
+    """
+    constants = {**backend.constants, "pi": backend.constants["π"]}
+    try:
+        tree = expression.parse(text, backend.parse, constants)
+        return expression.compile_tree(tree, backend.binary_ops, backend.functions)({})
+    except CalcError:
+        raise
+    except (ArithmeticError, ValueError) as ex:
+        raise CalcError(str(ex) or type(ex).__name__) from ex
+
+
+def make_backend(name="float", **options):
+    """名前からバックエンドを作る（options は DecimalBackend の precision など）"""
+    try:
+        return BACKENDS[name](**options)
+    except KeyError:
+        raise ValueError(f"unknown backend {name!r} (choose from {', '.join(BACKENDS)})") from None
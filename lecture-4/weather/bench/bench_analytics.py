@@ -0,0 +1,156 @@
+"""分析APIを合成の大規模履歴DBで計測
+
+1日3回の発表 × 7日先までの予報を N 行ぶん生成し、各集計の所要時間を表示する。
+temp_drift は全行をPythonに読み込んでループする素朴な実装とも比較する
+（--memory を付けると tracemalloc で計測したPython側のメモリのピークも表示する）。
+
+    python bench/bench_analytics.py [--rows 2000000] [--areas 58] [--memory]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from forecast_analytics import ForecastAnalytics  # noqa: E402
+from weather_db import WeatherDB  # noqa: E402
+
+WEATHERS = ["晴れ", "晴れ　時々　くもり", "くもり", "くもり　一時　雨", "雨", "雪"]
+LEAD_DAYS = 7
+REPORTS_PER_DAY = 3
+
+
+def fill(db, rows, areas):
+    """合成の履歴を書き込む（最終予報に向かって気温がぶれながら収束する）
+
+    値の無い気温（"-" や空文字）は NULL で保存されるので、比較で NULL の扱いも確かめられるよう
+    11時の発表の当日分の最低気温を NULL にしておく（合成のデータの決まりで、実際の予報とは異なる）。
+    """
+    rng = random.Random(0)
+    area_codes = [f"{i:02d}0000" for i in range(1, areas + 1)]
+    per_report = areas * LEAD_DAYS
+    reports = rows // per_report
+    base = date(2020, 1, 1)
+
+    def gen():
+        for r in range(reports):
+            day, slot = divmod(r, REPORTS_PER_DAY)
+            issued = base + timedelta(days=day)
+            created = f"{issued.isoformat()} {5 + slot * 6:02d}:00:00"
+            for area in area_codes:
+                for lead in range(LEAD_DAYS):
+                    target = (issued + timedelta(days=lead)).isoformat()
+                    noise = rng.randint(-lead, lead)
+                    temp_min = None if lead == 0 and slot == 1 else 5 + noise
+                    yield (area, target, rng.choice(WEATHERS), "北の風",
+                           temp_min, 15 + noise, created, f"{created}#{lead}")
+
+    def job(cur):
+        cur.executemany('''INSERT INTO forecasts
+                           (area_code, forecast_date, weather, wind, temp_min, temp_max, created_at, report_datetime)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', gen())
+        return cur.rowcount
+
+    return db.writer.submit(job).result()
+
+
+def python_loop_drift(db):
+    """比較用: 全行を読み込んでPythonで集計する（temp_drift と同じ結果を返す）
+
+    SQL と同じく最終予報の行そのものは数えず、NULL の気温は平均・最大から除く。
+    """
+    cur = db.conn.execute('''SELECT id, area_code, forecast_date, temp_min, temp_max FROM forecasts
+                             ORDER BY area_code, forecast_date, created_at, id''')
+    rows = cur.fetchall()
+    finals = {}
+    for row in rows:
+        finals[(row[1], row[2])] = row
+    stats = {}
+    for row_id, area, day, tmin, tmax in rows:
+        final_id, _, _, fmin, fmax = finals[(area, day)]
+        if row_id == final_id:
+            continue
+        # エリアごとに 最低気温の [件数, 差の合計, 絶対値の合計, 最大] と最高気温の同じもの
+        s = stats.setdefault(area, ([0, 0, 0, None], [0, 0, 0, None]))
+        for acc, value, final in ((s[0], tmin, fmin), (s[1], tmax, fmax)):
+            if value is None or final is None:
+                continue
+            diff = value - final
+            acc[0] += 1
+            acc[1] += diff
+            acc[2] += abs(diff)
+            acc[3] = abs(diff) if acc[3] is None else max(acc[3], abs(diff))
+    result = []
+    for area in sorted(stats):
+        (mn, mn_sum, mn_abs, mn_max), (mx, mx_sum, mx_abs, mx_max) = stats[area]
+        result.append({"area_code": area,
+                       "min_samples": mn, "min_bias": mn_sum / mn if mn else None,
+                       "min_mae": mn_abs / mn if mn else None, "min_max_error": mn_max,
+                       "max_samples": mx, "max_bias": mx_sum / mx if mx else None,
+                       "max_mae": mx_abs / mx if mx else None, "max_max_error": mx_max})
+    return result
+
+
+def same_rows(a, b):
+    """集計結果の比較（浮動小数点の値は誤差を許す）"""
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if x.keys() != y.keys():
+            return False
+        for k in x:
+            if isinstance(x[k], float) or isinstance(y[k], float):
+                if x[k] is None or y[k] is None or not math.isclose(x[k], y[k], rel_tol=1e-9, abs_tol=1e-9):
+                    return False
+            elif x[k] != y[k]:
+                return False
+    return True
+
+
+def timed(label, fn, memory=False):
+    start = time.perf_counter()
+    result = fn()
+    line = f"{label:<34}{time.perf_counter() - start:>9.3f} s"
+    if memory:
+        # 計測のオーバーヘッドが時間に乗らないよう、メモリはもう一度実行して測る
+        tracemalloc.start()
+        fn()
+        line += f"{tracemalloc.get_traced_memory()[1] / 1e6:>10.1f} MB peak"
+        tracemalloc.stop()
+    print(f"{line}   ({len(result)} result rows)")
+    return result
+
+
+def run(rows, areas, memory):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = WeatherDB(os.path.join(tmp, "analytics.db"))
+        start = time.perf_counter()
+        n = fill(db, rows, areas)
+        print(f"generated {n} rows in {time.perf_counter() - start:.1f} s")
+
+        analytics = ForecastAnalytics(db)
+        some = [f"{i:02d}0000" for i in range(1, 4)]
+        # 比較の前に、Pythonのループが同じ計算をしていることを確認する
+        assert same_rows(python_loop_drift(db), analytics.temp_drift()), "python loop does not match temp_drift"
+        timed("temp_drift (all areas)", analytics.temp_drift, memory)
+        timed("temp_drift (python loop)", lambda: python_loop_drift(db), memory)
+        timed("temp_drift (3 areas)", lambda: analytics.temp_drift(some))
+        timed("revision_steps (all areas)", analytics.revision_steps)
+        timed("weather_frequencies (all areas)", analytics.weather_frequencies)
+        timed("compare_areas (3 areas)", lambda: analytics.compare_areas(some))
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--areas", type=int, default=58)
+    parser.add_argument("--memory", action="store_true")
+    args = parser.parse_args()
+    run(args.rows, args.areas, args.memory)
@@ -0,0 +1,70 @@
+"""予報履歴のエクスポート・インポートの速度とファイルサイズ
+
+N日分の履歴（1日3回の発表 × 地域数 × 3日分の予報）を作り、export_archive と
+import_archive の所要時間、行あたりのサイズを、SQLiteのファイルと比べて表示する。
+
+    python bench/bench_archive.py [--days 365] [--areas 50] [--chunk-rows 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from weather_archive import CHUNK_ROWS, export_archive, import_archive  # noqa: E402
+from weather_db import WeatherDB  # noqa: E402
+
+REPORT_HOURS = (5, 11, 17)
+
+
+def fill(db, days, areas):
+    start = datetime(2025, 1, 1)
+    for day in range(days):
+        base = start + timedelta(days=day)
+        for hour in REPORT_HOURS:
+            report = base.replace(hour=hour)
+            rows = [(f"{a:02d}0000", (base + timedelta(days=d)).strftime("%Y-%m-%d"), "晴れ　時々　くもり",
+                     "北の風　やや強く", 1 + a % 5, 10 + d, report.strftime("%Y-%m-%d %H:%M:%S"),
+                     report.isoformat(timespec="minutes"))
+                    for a in range(areas) for d in range(3)]
+            db.import_rows(rows=rows, wait=False)
+    db.import_rows([(f"{a:02d}0000", f"area {a}") for a in range(areas)])
+
+
+def run(days, areas, chunk_rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        src = WeatherDB(os.path.join(tmp, "src.db"))
+        fill(src, days, areas)
+        src.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        rows = src.conn.execute("SELECT COUNT(*) FROM forecasts").fetchone()[0]
+        db_size = os.path.getsize(os.path.join(tmp, "src.db"))
+
+        path = os.path.join(tmp, "history.jsonl.gz")
+        start = time.perf_counter()
+        export_archive(src, path, chunk_rows)
+        export_time = time.perf_counter() - start
+        src.close()
+
+        dst = WeatherDB(os.path.join(tmp, "dst.db"))
+        start = time.perf_counter()
+        counts = import_archive(dst, path)
+        import_time = time.perf_counter() - start
+        dst.close()
+
+        size = os.path.getsize(path)
+        print(f"{rows} rows, sqlite {db_size / 1024:.0f} KB ({db_size / rows:.1f} B/row), "
+              f"archive {size / 1024:.0f} KB ({size / rows:.1f} B/row)")
+        print(f"export: {export_time:.2f}s ({rows / export_time:,.0f} rows/s)")
+        print(f"import: {import_time:.2f}s ({rows / import_time:,.0f} rows/s), inserted {counts['inserted']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--areas", type=int, default=50)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    run(args.days, args.areas, args.chunk_rows)
@@ -0,0 +1,73 @@
+"""クリックを繰り返したときの履歴の増え方を比較（重複保存あり / 発表時刻で重複排除）
+
+N日分、1日に何度もクリックした状況を再現し、行数・ファイルサイズ・
+get_by_date の所要時間、compact() 後の結果を表示する。
+
+    python bench/bench_history.py [--days 90] [--clicks 24] [--areas 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from weather_db import WeatherDB  # noqa: E402
+
+REPORT_HOURS = (5, 11, 17)
+
+
+def simulate(db, days, clicks, areas, dedup):
+    start = datetime.now() - timedelta(days=days)
+    for day in range(days):
+        base = start + timedelta(days=day)
+        for k in range(clicks):
+            clicked = base + timedelta(hours=24 * k / clicks)
+            hour = max([h for h in REPORT_HOURS if h <= clicked.hour], default=REPORT_HOURS[-1])
+            report = (clicked if hour <= clicked.hour else clicked - timedelta(days=1)).replace(hour=hour, minute=0)
+            forecasts = [{"date": (base + timedelta(days=d)).strftime("%Y-%m-%d"), "weather": "晴れ",
+                          "wind": "北の風", "min": 1, "max": 10,
+                          "report_datetime": report.isoformat(timespec="minutes") if dedup else None}
+                         for d in range(3)]
+            items = [(f"{a:02d}0000", "area", forecasts) for a in range(areas)]
+            now = clicked.strftime("%Y-%m-%d %H:%M:%S")
+            db.writer.submit(lambda cur, items=items, now=now: WeatherDB._insert(cur, items, now))
+    db.writer.submit(lambda cur: None).result()
+
+
+def stats(db, path, date_str):
+    rows = db.conn.execute("SELECT COUNT(*) FROM forecasts").fetchone()[0]
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    size = os.path.getsize(path)
+    start = time.perf_counter()
+    for _ in range(50):
+        db.get_by_date("000000", date_str)
+    return rows, size, (time.perf_counter() - start) / 50 * 1000
+
+
+def run(days, clicks, areas):
+    date_str = (datetime.now() - timedelta(days=days // 2)).strftime("%Y-%m-%d")
+    print(f"{'mode':<22}{'rows':>10}{'size (KB)':>12}{'get_by_date (ms)':>18}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dedup in (False, True):
+            path = os.path.join(tmp, f"history_{dedup}.db")
+            db = WeatherDB(path)
+            simulate(db, days, clicks, areas, dedup)
+            label = "dedup" if dedup else "every click"
+            for suffix in ("", " + compact"):
+                if suffix:
+                    db.compact()
+                rows, size, elapsed = stats(db, path, date_str)
+                print(f"{label + suffix:<22}{rows:>10}{size / 1024:>12.0f}{elapsed:>18.3f}")
+            db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--clicks", type=int, default=24, help="1日あたりのクリック数")
+    parser.add_argument("--areas", type=int, default=20)
+    args = parser.parse_args()
+    run(args.days, args.clicks, args.areas)
@@ -0,0 +1,42 @@
+"""レスポンスキャッシュの効果を計測（初回 / TTL内 / 再検証）
+
+    python bench/bench_http_cache.py [--delay 0.02]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from http_cache import HttpCache  # noqa: E402
+from prefetch import prefetch_all  # noqa: E402
+from stub_server import StubJMAServer  # noqa: E402
+from weather_db import WeatherDB  # noqa: E402
+
+
+def run(delay):
+    with tempfile.TemporaryDirectory() as tmp, StubJMAServer(delay=delay) as stub:
+        db = WeatherDB(os.path.join(tmp, "bench.db"))
+        cache = HttpCache(os.path.join(tmp, "cache.db"))
+
+        for label in ("cold", "warm (ttl)", "revalidate"):
+            if label == "revalidate":
+                # TTL切れを再現するため取得時刻を過去にずらす
+                cache.conn.execute("UPDATE responses SET fetched_at = fetched_at - 1e9")
+                cache.conn.commit()
+            before = dict(cache.stats.as_dict())
+            start = time.perf_counter()
+            prefetch_all(db, stub.area_url, stub.forecast_url, cache=cache)
+            elapsed = time.perf_counter() - start
+            after = cache.stats.as_dict()
+            delta = {k: after[k] - before[k] for k in after}
+            print(f"{label:<12} {elapsed:.3f}s  {delta}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay", type=float, default=0.02, help="スタブの応答遅延（秒）")
+    args = parser.parse_args()
+    run(args.delay)
@@ -0,0 +1,76 @@
+"""予報JSONの解析スループットを計測（fixtures/forecast_*.json）
+
+旧: json.loads + on_area_click にあった areas[0] だけの解析
+新: forecast_parser.parse（全細分区域・全timeSeries）+ to_forecast_list
+
+    python bench/bench_parser.py [--seconds 1.0]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+import forecast_parser  # noqa: E402
+
+
+def legacy_parse(body):
+    res = json.loads(body)
+    weather_ts = res[0]["timeSeries"][0]
+    temp_data = []
+    for ts in res[0]["timeSeries"]:
+        if "temps" in ts["areas"][0]:
+            temp_data = ts["areas"][0]["temps"]
+            break
+    forecast_list = []
+    for i in range(len(weather_ts["areas"][0]["weathers"])):
+        min_t = temp_data[i*2] if len(temp_data) > i*2 else "-"
+        max_t = temp_data[i*2+1] if len(temp_data) > i*2+1 else "-"
+        forecast_list.append({
+            "date": weather_ts["timeDefines"][i][:10],
+            "weather": weather_ts["areas"][0]["weathers"][i],
+            "wind": weather_ts["areas"][0]["winds"][i],
+            "min": min_t, "max": max_t
+        })
+    return forecast_list
+
+
+def new_parse(body):
+    return forecast_parser.to_forecast_list(forecast_parser.parse(body))
+
+
+def throughput(fn, bodies, seconds):
+    """seconds 秒間くり返し、(docs/sec, MB/sec) を返す"""
+    total_bytes = sum(len(b) for b in bodies)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for body in bodies:
+            fn(body)
+        count += 1
+    elapsed = time.perf_counter() - start
+    return count * len(bodies) / elapsed, count * total_bytes / elapsed / 1e6
+
+
+def run(seconds):
+    bodies = [open(p, "rb").read() for p in sorted(glob.glob(os.path.join(BENCH_DIR, "fixtures", "forecast_*.json")))]
+    print(f"fixtures: {len(bodies)}  json backend: {'orjson' if forecast_parser.orjson else 'json'}")
+    cases = {
+        "legacy (areas[0] only)": legacy_parse,
+        "parse() records only": forecast_parser.parse,
+        "parse() + to_forecast_list": new_parse,
+    }
+    for label, fn in cases.items():
+        docs, mb = throughput(fn, bodies, seconds)
+        print(f"{label:<30}{docs:>12.0f} docs/s{mb:>10.1f} MB/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+    run(args.seconds)
@@ -0,0 +1,31 @@
+"""全office一括取得の計測（直列 vs 並列）
+
+    python bench/bench_prefetch.py [--delay 0.05] [--workers 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from prefetch import prefetch_all  # noqa: E402
+from stub_server import StubJMAServer  # noqa: E402
+from weather_db import WeatherDB  # noqa: E402
+
+
+def run(delay, workers):
+    with tempfile.TemporaryDirectory() as tmp, StubJMAServer(delay=delay) as stub:
+        for n in (1, workers):
+            db = WeatherDB(os.path.join(tmp, f"bench_{n}.db"))
+            report = prefetch_all(db, stub.area_url, stub.forecast_url, max_workers=n)
+            print(f"--- workers={n}")
+            print(report.summary())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay", type=float, default=0.05, help="スタブの応答遅延（秒）")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    run(args.delay, args.workers)
@@ -0,0 +1,88 @@
+"""履歴の件数を増やしながら get_latest / get_by_date の所要時間を計測
+
+インデックスのない旧スキーマ (user_version 0) と移行後のスキーマを比較する。
+
+    python bench/bench_queries.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from weather_db import WeatherDB  # noqa: E402
+
+AREAS = [f"{i:02d}0000" for i in range(1, 48)]
+LEGACY_SCHEMA = '''CREATE TABLE forecasts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    area_code TEXT, forecast_date TEXT, weather TEXT, wind TEXT,
+                    temp_min TEXT, temp_max TEXT, created_at TEXT)'''
+
+
+def fill_legacy(path, rows):
+    """旧スキーマのDBに合成履歴を書き込む（1回の取得で3日分）"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE areas (code TEXT PRIMARY KEY, name TEXT)")
+    conn.execute(LEGACY_SCHEMA)
+    rng = random.Random(0)
+
+    def gen():
+        for n in range(rows // 3):
+            area = AREAS[n % len(AREAS)]
+            fetch = n // len(AREAS)
+            day = fetch // 3
+            created = f"2025-01-01 00:00:00+{fetch:08d}"
+            for d in range(3):
+                yield (area, f"D{day + d:06d}", "晴れ", "北の風",
+                       str(rng.randint(-5, 15)), str(rng.randint(5, 30)), created)
+
+    conn.executemany('''INSERT INTO forecasts (area_code, forecast_date, weather, wind, temp_min, temp_max, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)''', gen())
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat=50):
+    samples = []
+    for i in range(repeat):
+        area = AREAS[i % len(AREAS)]
+        start = time.perf_counter()
+        fn(area)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def measure(db):
+    latest = timed(db.get_latest)
+    by_date = timed(lambda area: db.get_by_date(area, "D000010"))
+    return latest, by_date
+
+
+class _LegacyDB(WeatherDB):
+    """マイグレーションを行わない旧スキーマのまま計測するためのDB"""
+
+    def init_tables(self):
+        pass
+
+
+def run(sizes):
+    print(f"{'rows':>10}  {'legacy latest':>14}  {'legacy date':>12}  {'v1 latest':>10}  {'v1 date':>10}  (ms, median)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"q_{rows}.db")
+            fill_legacy(path, rows)
+            legacy = measure(_LegacyDB(path))
+            migrated = measure(WeatherDB(path))
+            print(f"{rows:>10}  {legacy[0]:>14.3f}  {legacy[1]:>12.3f}  {migrated[0]:>10.3f}  {migrated[1]:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    run(args.sizes)
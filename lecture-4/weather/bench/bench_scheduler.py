@@ -0,0 +1,86 @@
+"""スケジューラのやり直しの確認と、run_once の所要時間
+
+1. 発表の直後でまだ古い予報（11時の発表）しか無いスタブに対して 17時の回を実行し、
+   2回目の取得の後で 17時の発表に差し替える。キャッシュ（HttpCache）を使っていても
+   やり直しで新しい発表を取得できることを確認する。
+2. 全officeを1回更新する run_once の所要時間（キャッシュあり / なし）。
+
+    python bench/bench_scheduler.py [--delay 0.05] [--workers 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from area_index import build_index, iter_offices  # noqa: E402
+from forecast_parser import loads  # noqa: E402
+from http_cache import HttpCache  # noqa: E402
+from scheduler import JST, RefreshScheduler, has_current_report  # noqa: E402
+from stub_server import StubJMAServer  # noqa: E402
+from weather_db import WeatherDB  # noqa: E402
+
+OLD_REPORT = b"2025-01-10T11:00:00+09:00"
+NEW_REPORT = b"2025-01-10T17:00:00+09:00"
+# 17時の発表の6分後
+NOW = datetime(2025, 1, 10, 17, 6, tzinfo=JST)
+
+
+def check_retry_gets_new_report(tmp):
+    with StubJMAServer() as stub:
+        old_body = stub.forecast_body
+        assert OLD_REPORT in old_body
+        count = stub.count
+        fetches = [0]
+
+        def publish_after_first_fetch(path):
+            # 2回目は 304（まだ発表前）、3回目以降のリクエストには新しい発表を返す
+            count(path)
+            if path != "304":
+                fetches[0] += 1
+                if fetches[0] == 3:
+                    stub.forecast_body = old_body.replace(OLD_REPORT, NEW_REPORT)
+
+        stub.count = publish_after_first_fetch
+        db = WeatherDB(os.path.join(tmp, "retry.db"))
+        cache = HttpCache(os.path.join(tmp, "retry_cache.db"))
+        scheduler = RefreshScheduler(db, [("130000", "東京都")], cache, stub.forecast_url, max_workers=1,
+                                     backoff_base=0.01, backoff_max=0.01)
+        run = scheduler.run_once(NOW)
+        upstream = sum(n for path, n in stub.requests.items() if path != "304")
+        print(f"retry check: ok={run['ok']} retries={run['retries']} upstream requests={upstream} "
+              f"cache={cache.stats.as_dict()}")
+        assert run["ok"] == 1 and not run["failed"], run["failed"]
+        assert run["retries"] == 2 and upstream == 3 and cache.stats.revalidated == 1
+        assert has_current_report(db, "130000", NOW)
+        db.close()
+
+
+def time_run_once(tmp, delay, workers):
+    with StubJMAServer(delay=delay) as stub:
+        offices = list(iter_offices(build_index(loads(stub.area_body))))
+        # 全officeがすでに最新の発表を持つので、やり直しなしで1回ずつ取得する
+        stub.forecast_body = stub.forecast_body.replace(OLD_REPORT, NEW_REPORT)
+        for use_cache in (False, True):
+            label = "cache" if use_cache else "no cache"
+            cache = HttpCache(os.path.join(tmp, "cache.db")) if use_cache else None
+            db = WeatherDB(os.path.join(tmp, f"run_{use_cache}.db"))
+            scheduler = RefreshScheduler(db, offices, cache, stub.forecast_url, workers)
+            for i in range(2):
+                run = scheduler.run_once(NOW)
+                print(f"{label:<9} run {i + 1}: {run['ok']}/{run['areas']} ok, {run['rows_written']} rows, "
+                      f"{run['wall_time']:.3f}s")
+            db.close()
+        print(f"304 responses: {stub.requests.get('304', 0)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay", type=float, default=0.05, help="スタブの応答遅延（秒）")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        check_retry_gets_new_report(tmp)
+        time_run_once(tmp, args.delay, args.workers)
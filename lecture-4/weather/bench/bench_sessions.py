@@ -0,0 +1,126 @@
+"""複数セッションの同時利用を模した負荷テスト（画面は表示しない。要 flet）
+
+N 個のセッションが1つのイベントループ上で地域のクリックを繰り返し、
+クリックから描画（最新の予報でカードを組み立て終わるまで）の時間を測る。
+main.py の on_area_click と同じ順に、保存済みの表示 → 取得 → 再表示を行う。
+
+    python bench/bench_sessions.py [--sessions 50] [--clicks 10] [--delay 0.05]
+
+shared:     プロセスで共有する状態（読み込みの接続プール・共有の地域インデックス・
+            セッションをまたいだ取得の合流）
+per-session: セッションごとに地域インデックスを読み直し、取得もセッション内でしか
+            合流せず、読み込みは1本の接続を共有する（変更前の構成）
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from area_index import SharedAreaIndex, iter_offices, refresh_index  # noqa: E402
+from forecast_service import ForecastFetcher  # noqa: E402
+from forecast_view import build_card  # noqa: E402
+from http_cache import HttpCache  # noqa: E402
+from prefetch import make_session  # noqa: E402
+from stub_server import StubJMAServer  # noqa: E402
+from weather_db import WeatherDB  # noqa: E402
+
+
+def render(db, area_code):
+    """ForecastView.show と同じ読み込みとカードの組み立て（update は送らない）"""
+    return [build_card(r) for r in db.get_latest(area_code)]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def session(n, state, clicks, latencies, think):
+    rng = random.Random(n)
+    index = state["areas"]()
+    offices = list(iter_offices(index))
+    # よく見られる地域に偏らせる（上位8地域に7割のクリック）
+    hot = offices[:8]
+    fetcher = state["fetcher"]()
+    db = state["db"]
+    for _ in range(clicks):
+        code, name = rng.choice(hot) if rng.random() < 0.7 else rng.choice(offices)
+        start = time.perf_counter()
+        await asyncio.to_thread(render, db, code)
+        first = time.perf_counter() - start
+        try:
+            await fetcher.refresh(code, name)
+        except Exception as ex:
+            print(f"Fetch Error: {ex}")
+        await asyncio.to_thread(render, db, code)
+        latencies.append((first, time.perf_counter() - start))
+        await asyncio.sleep(rng.uniform(0, think))
+
+
+async def run_sessions(state, sessions, clicks, think):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(session(n, state, clicks, latencies, think) for n in range(sessions)))
+    return latencies, time.perf_counter() - start
+
+
+def make_state(mode, tmp, stub, use_cache):
+    cache = HttpCache(os.path.join(tmp, f"cache_{mode}.db")) if use_cache else None
+    index_path = os.path.join(tmp, f"area_index_{mode}.json")
+    refresh_index(cache, stub.area_url, index_path)
+    if mode == "shared":
+        db = WeatherDB(os.path.join(tmp, f"{mode}.db"))
+        areas = SharedAreaIndex(cache, stub.area_url, index_path)
+        fetcher = ForecastFetcher(db, cache, stub.forecast_url, session=make_session())
+        return {"db": db, "areas": areas.get, "fetcher": lambda: fetcher, "fetchers": [fetcher]}
+    db = WeatherDB(os.path.join(tmp, f"{mode}.db"), read_pool_size=1)
+    fetchers = []
+
+    def new_fetcher():
+        fetchers.append(ForecastFetcher(db, cache, stub.forecast_url))
+        return fetchers[-1]
+
+    # 変更前の main() はセッションごとに area.json を読み直していた
+    return {"db": db, "areas": lambda: refresh_index(cache, stub.area_url, index_path),
+            "fetcher": new_fetcher, "fetchers": fetchers}
+
+
+def run(sessions, clicks, delay, think, modes, use_cache):
+    print(f"{sessions} sessions x {clicks} clicks, stub delay {delay * 1000:.0f} ms, "
+          f"http cache {'on' if use_cache else 'off'}")
+    print(f"{'mode':<13}{'first p50':>10}{'first p99':>10}{'fresh p50':>10}{'fresh p99':>10}"
+          f"{'wall':>8}{'upstream':>10}{'coalesced':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in modes:
+            with StubJMAServer(delay=delay) as stub:
+                state = make_state(mode, tmp, stub, use_cache)
+                stub.requests.clear()
+                latencies, wall = asyncio.run(run_sessions(state, sessions, clicks, think))
+                first = [a * 1000 for a, _ in latencies]
+                fresh = [b * 1000 for _, b in latencies]
+                upstream = sum(v for k, v in stub.requests.items() if k != "304")  # 304 も1往復に数える
+                coalesced = sum(f.coalesced for f in state["fetchers"])
+                print(f"{mode:<13}{statistics.median(first):>8.1f}ms{percentile(first, 99):>8.1f}ms"
+                      f"{statistics.median(fresh):>8.1f}ms{percentile(fresh, 99):>8.1f}ms"
+                      f"{wall:>7.1f}s{upstream:>10}{coalesced:>10}")
+                for f in state["fetchers"]:
+                    f.close()
+                state["db"].close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--clicks", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.05, help="スタブの応答遅延（秒）")
+    parser.add_argument("--think", type=float, default=0.2, help="クリックの間隔の最大値（秒）")
+    parser.add_argument("--mode", choices=["shared", "per-session"], nargs="+", default=["per-session", "shared"])
+    parser.add_argument("--no-cache", action="store_true", help="HTTPキャッシュを使わない（毎回取得する）")
+    args = parser.parse_args()
+    run(args.sessions, args.clicks, args.delay, args.think, args.mode, not args.no_cache)
@@ -0,0 +1,71 @@
+"""起動から地域メニューを表示できるまでの時間（time-to-first-frame）を計測
+
+旧: area.json を毎回取得・解析し、全地方の ListTile をまとめて作る
+新: 保存済みの地域インデックスを読み込み、ListTile は地方を開いたときに作る
+
+    python bench/bench_startup.py [--delay 0.2] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import flet as ft  # noqa: E402
+import requests  # noqa: E402
+
+from area_index import build_index, load_index, refresh_index  # noqa: E402
+from area_menu import build_area_menu  # noqa: E402
+from stub_server import StubJMAServer  # noqa: E402
+
+
+def legacy_startup(area_url):
+    area_raw = requests.get(area_url).json()
+    area_menu = ft.Column(scroll=ft.ScrollMode.AUTO)
+    for c_code, c_info in area_raw["centers"].items():
+        state_tiles = [
+            ft.ListTile(title=ft.Text(area_raw["offices"][ch]["name"]), on_click=None, data=ch)
+            for ch in c_info["children"] if ch in area_raw["offices"]
+        ]
+        area_menu.controls.append(ft.ExpansionTile(title=ft.Text(c_info["name"]), controls=state_tiles))
+    return area_menu
+
+
+def cached_startup(index_path, lazy=True):
+    return ft.Column(build_area_menu(load_index(index_path), None, lazy), scroll=ft.ScrollMode.AUTO)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def run(delay, repeat):
+    with tempfile.TemporaryDirectory() as tmp, StubJMAServer(delay=delay) as stub:
+        index_path = os.path.join(tmp, "area_index.json")
+        refresh_index(area_url=stub.area_url, path=index_path)
+        index = load_index(index_path)
+        assert index == build_index(requests.get(stub.area_url).json())
+
+        results = {
+            "fetch area.json + eager menu": timed(lambda: legacy_startup(stub.area_url), repeat),
+            "index file + eager menu": timed(lambda: cached_startup(index_path, lazy=False), repeat),
+            "index file + lazy menu": timed(lambda: cached_startup(index_path), repeat),
+        }
+        for label, ms in results.items():
+            print(f"{label:<32}{ms:>10.2f} ms (median)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delay", type=float, default=0.2, help="スタブの応答遅延（秒）")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.delay, args.repeat)
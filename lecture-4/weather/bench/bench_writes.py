@@ -0,0 +1,86 @@
+"""save_data の書き込みスループット（rows/sec）を旧実装と比較
+
+旧実装: ロールバックジャーナル、1行ずつ execute、取得ごとに commit、全スレッドで1接続を共有
+新実装: WAL + executemany + 書き込み専用スレッドでのグループコミット
+
+    python bench/bench_writes.py [--fetches 2000] [--threads 8]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from weather_db import WeatherDB  # noqa: E402
+
+FORECASTS = [
+    {"date": "2025-01-10", "weather": "晴れ", "wind": "北の風", "min": None, "max": "11"},
+    {"date": "2025-01-11", "weather": "くもり", "wind": "北の風", "min": "1", "max": "10"},
+    {"date": "2025-01-12", "weather": "雨", "wind": "南の風", "min": "3", "max": "9"},
+]
+
+
+class LegacyWriter:
+    """リファクタリング前の save_data をそのまま再現したもの"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS areas (code TEXT PRIMARY KEY, name TEXT)")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS forecasts (
+                             id INTEGER PRIMARY KEY AUTOINCREMENT, area_code TEXT, forecast_date TEXT,
+                             weather TEXT, wind TEXT, temp_min TEXT, temp_max TEXT, created_at TEXT)''')
+        self.conn.commit()
+
+    def save_data(self, area_code, area_name, forecasts):
+        cur = self.conn.cursor()
+        cur.execute("INSERT OR REPLACE INTO areas VALUES (?, ?)", (area_code, area_name))
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for f in forecasts:
+            cur.execute('''INSERT INTO forecasts (area_code, forecast_date, weather, wind, temp_min, temp_max, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                        (area_code, f['date'], f['weather'], f['wind'], f['min'], f['max'], now))
+        self.conn.commit()
+
+
+def run_writes(db, fetches, threads):
+    errors = []
+
+    def worker(offset):
+        for n in range(offset, fetches, threads):
+            try:
+                db.save_data(f"{n % 47:02d}0000", "area", FORECASTS)
+            except sqlite3.Error as ex:
+                errors.append(ex)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return fetches * len(FORECASTS) / elapsed, len(errors)
+
+
+def run(fetches, threads):
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_threads in (1, threads):
+            legacy = run_writes(LegacyWriter(os.path.join(tmp, f"legacy_{n_threads}.db")), fetches, n_threads)
+            db = WeatherDB(os.path.join(tmp, f"wal_{n_threads}.db"))
+            batched = run_writes(db, fetches, n_threads)
+            db.close()
+            print(f"threads={n_threads:<3} legacy: {legacy[0]:>10.0f} rows/s (errors {legacy[1]})   "
+                  f"wal+queue: {batched[0]:>10.0f} rows/s (errors {batched[1]})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fetches", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    run(args.fetches, args.threads)
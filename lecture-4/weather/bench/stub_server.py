@@ -0,0 +1,122 @@
+"""気象庁APIを模したローカルスタブHTTPサーバー
+
+fixtures/ の area.json と forecast_130000.json を返す。予報は全officeで同じ
+テンプレートを使う。ETag / Last-Modified を返し、条件付きGETには 304 で応える。
+テストやベンチマークから次のように使う:
+
+    with StubJMAServer(delay=0.05) as stub:
+        prefetch_all(db, stub.area_url, stub.forecast_url)
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+AREA_PATH = "/bosai/common/const/area.json"
+FORECAST_PATH = re.compile(r"^/bosai/forecast/data/forecast/(\d+)\.json$")
+LAST_MODIFIED = "Fri, 10 Jan 2025 02:00:00 GMT"
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+        return f.read()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        stub = self.server.stub
+        stub.count(self.path)
+        if stub.delay:
+            time.sleep(stub.delay)
+
+        if self.path == AREA_PATH:
+            body = stub.area_body
+        else:
+            m = FORECAST_PATH.match(self.path)
+            if not m or m.group(1) in stub.fail_codes:
+                self.send_error(404)
+                return
+            body = stub.forecast_body
+
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        # If-None-Match があればそちらだけで判定する（RFC 9110。本文を差し替えても更新日時は同じため）
+        if self.headers.get("If-None-Match"):
+            not_modified = self.headers["If-None-Match"] == etag
+        else:
+            not_modified = self.headers.get("If-Modified-Since") == LAST_MODIFIED
+        if not_modified:
+            stub.count("304")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubJMAServer:
+    def __init__(self, delay=0.0, fail_codes=(), area_body=None, forecast_body=None):
+        self.delay = delay
+        self.fail_codes = set(fail_codes)
+        self.area_body = area_body or load_fixture("area.json")
+        self.forecast_body = forecast_body or load_fixture("forecast_130000.json")
+        self.requests = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def area_url(self):
+        return self.base_url + AREA_PATH
+
+    @property
+    def forecast_url(self):
+        return self.base_url + "/bosai/forecast/data/forecast/{}.json"
+
+    def count(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    with StubJMAServer() as stub:
+        print(f"area:     {stub.area_url}")
+        print(f"forecast: {stub.forecast_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
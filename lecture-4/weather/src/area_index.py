@@ -0,0 +1,155 @@
+"""地域メニュー用のコンパクトな地域インデックス
+
+area.json は大きいので、起動のたびに取得・解析せず、メニューに必要な
+[center_code, center_name, [[office_code, office_name], ...]] の形だけを
+ファイルに保存しておき、次回の起動ではそれを読み込む。
+Webアプリとして動かすときは SharedAreaIndex で1プロセスに1つだけ持ち、
+全セッションで同じインデックスを使う（セッションごとに読み込み・取得しない）。
+ネットワークが使えないときは、キャッシュ済みの area.json や DB の areas テーブル
+から作る（local_index）。
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from forecast_parser import loads
+from jma_api import AREA_URL, fetch_area
+from metrics import metrics
+
+AREA_INDEX_FILE = "area_index.json"
+# 共有インデックスを取得し直す間隔（秒）。これより新しければどのセッションも取得しない
+AREA_REFRESH_INTERVAL = 60 * 60
+# DB の areas テーブルから作ったインデックスの地方名
+LOCAL_CENTER = ["local", "保存済みの地域"]
+
+
+def build_index(area_raw):
+    """area.json から地域インデックスを作成"""
+    offices = area_raw["offices"]
+    return [
+        [c_code, c_info["name"], [[ch, offices[ch]["name"]] for ch in c_info["children"] if ch in offices]]
+        for c_code, c_info in area_raw["centers"].items()
+    ]
+
+
+def load_index(path=AREA_INDEX_FILE):
+    """保存済みの地域インデックスを読み込む。無い・壊れている場合は None"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_index(index, path=AREA_INDEX_FILE):
+    # 書き込み途中のファイルを読まないよう、一時ファイルに書いてから置き換える。
+    # アプリとスケジューラが同時に書いても混ざらないよう、一時ファイルは毎回別の名前にする
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                               suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def refresh_index(cache=None, area_url=AREA_URL, path=AREA_INDEX_FILE, session=None):
+    """area.json を取得して地域インデックスを作り直す"""
+    index = build_index(fetch_area(session, area_url, cache))
+    save_index(index, path)
+    return index
+
+
+def index_from_db(db):
+    """DB に保存済みの地域だけのインデックス。1件も無ければ None"""
+    with db.reader() as conn:
+        offices = [list(row) for row in conn.execute("SELECT code, name FROM areas ORDER BY code")]
+    return [LOCAL_CENTER + [offices]] if offices else None
+
+
+def local_index(path=AREA_INDEX_FILE, cache=None, db=None, area_url=AREA_URL):
+    """ネットワークを使わずにインデックスを作る
+
+    保存済みのファイル → キャッシュ済みの area.json（期限切れでも使う）→ DB の areas の順に試す。
+    """
+    index = load_index(path)
+    if index is None and cache is not None:
+        body = cache.peek(area_url)
+        if body is not None:
+            index = build_index(loads(body))
+    if index is None and db is not None:
+        index = index_from_db(db)
+    return index
+
+
+def iter_offices(index):
+    """インデックス内の (office_code, office_name) を順に返す"""
+    for _, _, offices in index:
+        for code, name in offices:
+            yield code, name
+
+
+class SharedAreaIndex:
+    """プロセス内の全セッションで共有する地域インデックス
+
+    get() は最初の1回だけファイルを読み（無ければ取得し）、以降は同じリストを返す。
+    refresh() は同時に呼ばれても取得は1回で、他のスレッドはその結果を待って使う。
+    内容が変わらなければ同じオブジェクトのままなので、`is` で変化を判定できる。
+    """
+
+    def __init__(self, cache=None, area_url=AREA_URL, path=AREA_INDEX_FILE,
+                 refresh_interval=AREA_REFRESH_INTERVAL, session=None, db=None, offline=False):
+        self.cache = cache
+        self.area_url = area_url
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.session = session
+        self.db = db
+        # オフラインでは取得せず、手元のデータ（local_index）だけを使う
+        self.offline = offline
+        self.index = None
+        self.refreshed_at = None   # 最後に取得した時刻 (time.monotonic)
+        self.refresh_count = 0
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def stale(self):
+        if self.offline:
+            return False
+        return self.refreshed_at is None or time.monotonic() - self.refreshed_at > self.refresh_interval
+
+    def get(self):
+        if self.index is None:
+            with self._load_lock:
+                if self.index is None:
+                    self.index = self._load()
+        return self.index
+
+    def _load(self):
+        index = load_index(self.path)
+        if index is not None:
+            return index
+        if not self.offline:
+            try:
+                return self.refresh()
+            except Exception as ex:
+                # 初回起動でもネットワークが無ければ手元のデータで始める
+                metrics.error("area_fetch", ex)
+        return local_index(self.path, self.cache, self.db, self.area_url) or []
+
+    def refresh(self):
+        """area.json を取得し直して最新のインデックスを返す（取得済みで新しければ何もしない）"""
+        with self._refresh_lock:
+            if self.offline or (not self.stale and self.index is not None):
+                return self.index
+            fresh = refresh_index(self.cache, self.area_url, self.path, self.session)
+            self.refresh_count += 1
+            if fresh != self.index:
+                self.index = fresh
+            self.refreshed_at = time.monotonic()
+            return self.index
@@ -0,0 +1,25 @@
+import flet as ft
+
+
+def _office_tiles(offices, on_area_click):
+    return [ft.ListTile(title=ft.Text(name), on_click=on_area_click, data=code) for code, name in offices]
+
+
+def build_area_menu(index, on_area_click, lazy=True):
+    """地域インデックスから地方ごとの ExpansionTile を作る
+
+    lazy=True の場合、各地方の予報区の ListTile は最初に開いたときに作る。
+    """
+    def on_expand(e):
+        tile = e.control
+        if e.data == "true" and not tile.controls:
+            tile.controls = _office_tiles(tile.data, on_area_click)
+            tile.update()
+
+    tiles = []
+    for _, c_name, offices in index:
+        if lazy:
+            tiles.append(ft.ExpansionTile(title=ft.Text(c_name), controls=[], data=offices, on_change=on_expand))
+        else:
+            tiles.append(ft.ExpansionTile(title=ft.Text(c_name), controls=_office_tiles(offices, on_area_click)))
+    return tiles
@@ -0,0 +1,132 @@
+"""保存済みの予報履歴を集計する分析API
+
+集計はすべてSQLのウィンドウ関数と GROUP BY で行い、行をPythonに読み込んで
+ループすることはしない。(area_code, forecast_date, created_at) のインデックスに
+沿って PARTITION BY / ORDER BY するので、履歴が数百万行でもソートが発生しない。
+"""
+
+# 天気の文字列の先頭の語で分類する（"晴れ　時々　くもり" は "晴れ"）
+WEATHER_CATEGORY_SQL = '''CASE
+    WHEN weather LIKE '晴%' OR weather LIKE 'はれ%' THEN '晴れ'
+    WHEN weather LIKE 'くもり%' OR weather LIKE '曇%' THEN 'くもり'
+    WHEN weather LIKE '雨%' OR weather LIKE 'あめ%' THEN '雨'
+    WHEN weather LIKE '雪%' THEN '雪'
+    ELSE 'その他' END'''
+
+# 各 (area_code, forecast_date) の予報に、同じ日についての最終（最新）予報を並べる
+_WITH_FINAL = '''WITH snapshots AS (
+    SELECT id, area_code, forecast_date, weather, temp_min, temp_max,
+           LAST_VALUE(temp_min) OVER w AS final_min,
+           LAST_VALUE(temp_max) OVER w AS final_max,
+           LAST_VALUE(id) OVER w AS final_id
+    FROM forecasts
+    {where}
+    WINDOW w AS (PARTITION BY area_code, forecast_date ORDER BY created_at, id
+                 ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+)'''
+
+
+def _where(area_codes, start, end):
+    clauses, params = [], []
+    if area_codes:
+        clauses.append(f"area_code IN ({', '.join('?' * len(area_codes))})")
+        params += list(area_codes)
+    if start:
+        clauses.append("forecast_date >= ?")
+        params.append(start)
+    if end:
+        clauses.append("forecast_date <= ?")
+        params.append(end)
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _dicts(cur):
+    names = [d[0] for d in cur.description]
+    return [dict(zip(names, row)) for row in cur.fetchall()]
+
+
+class ForecastAnalytics:
+    def __init__(self, db):
+        self.db = db
+
+    def _query(self, sql, params):
+        with self.db.reader() as conn:
+            return _dicts(conn.execute(sql, params))
+
+    def temp_drift(self, area_codes=None, start=None, end=None):
+        """以前の予報が、同じ日の最終予報からどれだけずれていたか（エリアごと）
+
+        bias は (以前の予報 - 最終予報) の平均、mae は絶対値の平均、max は最大の絶対誤差。
+        samples はそれらの計算に使った組の数（どちらかの気温が NULL の組は数えない）。
+        """
+        where, params = _where(area_codes, start, end)
+        sql = _WITH_FINAL.format(where=where) + '''
+            SELECT area_code,
+                   COUNT(temp_min - final_min) AS min_samples,
+                   AVG(temp_min - final_min) AS min_bias,
+                   AVG(ABS(temp_min - final_min)) AS min_mae,
+                   MAX(ABS(temp_min - final_min)) AS min_max_error,
+                   COUNT(temp_max - final_max) AS max_samples,
+                   AVG(temp_max - final_max) AS max_bias,
+                   AVG(ABS(temp_max - final_max)) AS max_mae,
+                   MAX(ABS(temp_max - final_max)) AS max_max_error
+            FROM snapshots
+            WHERE id != final_id
+            GROUP BY area_code
+            ORDER BY area_code'''
+        return self._query(sql, params)
+
+    def revision_steps(self, area_codes=None, start=None, end=None):
+        """予報が更新されるたびの気温の変化量（直前の予報との差）の統計（エリアごと）"""
+        where, params = _where(area_codes, start, end)
+        sql = f'''
+            WITH steps AS (
+                SELECT area_code,
+                       temp_min - LAG(temp_min) OVER w AS d_min,
+                       temp_max - LAG(temp_max) OVER w AS d_max
+                FROM forecasts
+                {where}
+                WINDOW w AS (PARTITION BY area_code, forecast_date ORDER BY created_at, id)
+            )
+            SELECT area_code,
+                   COUNT(d_min) + COUNT(d_max) AS revisions,
+                   AVG(ABS(d_min)) AS min_step_mean,
+                   MAX(ABS(d_min)) AS min_step_max,
+                   AVG(ABS(d_max)) AS max_step_mean,
+                   MAX(ABS(d_max)) AS max_step_max,
+                   SUM(d_min != 0) + SUM(d_max != 0) AS changed
+            FROM steps
+            GROUP BY area_code
+            ORDER BY area_code'''
+        return self._query(sql, params)
+
+    def weather_frequencies(self, area_codes=None, start=None, end=None):
+        """最終予報の天気カテゴリごとの日数と割合（エリアごと）"""
+        where, params = _where(area_codes, start, end)
+        sql = _WITH_FINAL.format(where=where) + f'''
+            SELECT area_code, {WEATHER_CATEGORY_SQL} AS category,
+                   COUNT(*) AS days,
+                   COUNT(*) * 1.0 / SUM(COUNT(*)) OVER (PARTITION BY area_code) AS ratio
+            FROM snapshots
+            WHERE id = final_id
+            GROUP BY area_code, category
+            ORDER BY area_code, days DESC'''
+        return self._query(sql, params)
+
+    def compare_areas(self, area_codes, start=None, end=None):
+        """複数エリアの最終予報を並べて比較する（平均・極値・雨の日の割合）"""
+        where, params = _where(area_codes, start, end)
+        sql = _WITH_FINAL.format(where=where) + f'''
+            SELECT area_code,
+                   COUNT(*) AS days,
+                   AVG(temp_min) AS avg_min,
+                   AVG(temp_max) AS avg_max,
+                   MIN(temp_min) AS lowest,
+                   MAX(temp_max) AS highest,
+                   AVG(temp_max - temp_min) AS avg_range,
+                   AVG({WEATHER_CATEGORY_SQL} IN ('雨', '雪')) AS wet_ratio
+            FROM snapshots
+            WHERE id = final_id
+            GROUP BY area_code
+            ORDER BY area_code'''
+        return self._query(sql, params)
@@ -0,0 +1,275 @@
+"""気象庁の予報JSON (forecast/{office}.json) のパーサー
+
+レスポンスの bytes をそのまま受け取り（orjson があればそれを使う）、構造を検証しながら
+全ての細分区域・全ての timeSeries を __slots__ 付きの小さなレコードに変換する。
+
+    report = parse(body)
+    report.weathers      # 3日間の天気・風・波（細分区域ごと）
+    report.pops          # 6時間ごとの降水確率
+    report.temps         # 地点ごとの朝の最低・日中の最高気温
+    report.weekly        # 週間予報（天気コード・降水確率・信頼度）
+    report.weekly_temps  # 週間予報の気温（予測範囲つき）
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson が無ければ標準の json を使う
+    orjson = None
+
+
+class ForecastParseError(ValueError):
+    """予報JSONの構造が想定と異なる"""
+
+
+def loads(data):
+    """bytes / str のJSONを読み込む"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as ex:
+            raise ForecastParseError(f"invalid JSON: {ex}") from ex
+    try:
+        return json.loads(data)
+    except ValueError as ex:
+        raise ForecastParseError(f"invalid JSON: {ex}") from ex
+
+
+def to_int(value):
+    """数値の文字列を int に変換（"" や "-" は None）"""
+    if value is None or value == "" or value == "-":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# --- レコード ---
+class _Record:
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.astuple() == other.astuple()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def astuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+class WeatherRecord(_Record):
+    """3日間予報の天気・風・波（細分区域ごと）"""
+    __slots__ = ("area_code", "area_name", "time", "weather_code", "weather", "wind", "wave")
+
+    def __init__(self, area_code, area_name, time, weather_code, weather, wind, wave):
+        self.area_code = area_code
+        self.area_name = area_name
+        self.time = time
+        self.weather_code = weather_code
+        self.weather = weather
+        self.wind = wind
+        self.wave = wave
+
+
+class PopRecord(_Record):
+    """6時間ごとの降水確率 (%)"""
+    __slots__ = ("area_code", "area_name", "time", "pop")
+
+    def __init__(self, area_code, area_name, time, pop):
+        self.area_code = area_code
+        self.area_name = area_name
+        self.time = time
+        self.pop = pop
+
+
+class TempRecord(_Record):
+    """地点の気温。time が 00:00 なら朝の最低、09:00 なら日中の最高"""
+    __slots__ = ("station_code", "station_name", "time", "temp")
+
+    def __init__(self, station_code, station_name, time, temp):
+        self.station_code = station_code
+        self.station_name = station_name
+        self.time = time
+        self.temp = temp
+
+
+class WeeklyRecord(_Record):
+    """週間予報の天気コード・降水確率・信頼度"""
+    __slots__ = ("area_code", "area_name", "time", "weather_code", "pop", "reliability")
+
+    def __init__(self, area_code, area_name, time, weather_code, pop, reliability):
+        self.area_code = area_code
+        self.area_name = area_name
+        self.time = time
+        self.weather_code = weather_code
+        self.pop = pop
+        self.reliability = reliability
+
+
+class WeeklyTempRecord(_Record):
+    """週間予報の最低・最高気温と予測範囲"""
+    __slots__ = ("station_code", "station_name", "time",
+                 "temp_min", "temp_min_lower", "temp_min_upper",
+                 "temp_max", "temp_max_lower", "temp_max_upper")
+
+    def __init__(self, station_code, station_name, time,
+                 temp_min, temp_min_lower, temp_min_upper, temp_max, temp_max_lower, temp_max_upper):
+        self.station_code = station_code
+        self.station_name = station_name
+        self.time = time
+        self.temp_min = temp_min
+        self.temp_min_lower = temp_min_lower
+        self.temp_min_upper = temp_min_upper
+        self.temp_max = temp_max
+        self.temp_max_lower = temp_max_lower
+        self.temp_max_upper = temp_max_upper
+
+
+class ForecastReport:
+    __slots__ = ("publishing_office", "report_datetime", "weathers", "pops", "temps",
+                 "weekly_report_datetime", "weekly", "weekly_temps")
+
+    def __init__(self, publishing_office, report_datetime):
+        self.publishing_office = publishing_office
+        self.report_datetime = report_datetime
+        self.weekly_report_datetime = None
+        self.weathers = []
+        self.pops = []
+        self.temps = []
+        self.weekly = []
+        self.weekly_temps = []
+
+
+# --- 検証つきの取り出し ---
+def _field(obj, key, typ, path):
+    if not isinstance(obj, dict):
+        raise ForecastParseError(f"{path}: expected object")
+    value = obj.get(key)
+    if not isinstance(value, typ):
+        raise ForecastParseError(f"{path}.{key}: expected {typ.__name__}, got {type(value).__name__}")
+    return value
+
+
+def _series(area, key, length, path):
+    """areas[i][key] を取り出す。無ければ None、長さが timeDefines と違えばエラー"""
+    values = area.get(key)
+    if values is None:
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        raise ForecastParseError(f"{path}.{key}: expected list of {length} values")
+    return values
+
+
+def _areas(ts, path):
+    times = _field(ts, "timeDefines", list, path)
+    areas = _field(ts, "areas", list, path)
+    for j, area in enumerate(areas):
+        area_path = f"{path}.areas[{j}]"
+        info = _field(area, "area", dict, area_path)
+        yield area, info.get("code"), info.get("name"), times, area_path
+
+
+def _parse_short_term(block, report, path):
+    for i, ts in enumerate(_field(block, "timeSeries", list, path)):
+        ts_path = f"{path}.timeSeries[{i}]"
+        for area, code, name, times, area_path in _areas(ts, ts_path):
+            n = len(times)
+            weathers = _series(area, "weathers", n, area_path)
+            pops = _series(area, "pops", n, area_path)
+            temps = _series(area, "temps", n, area_path)
+            if weathers is not None:
+                codes = _series(area, "weatherCodes", n, area_path) or [None] * n
+                winds = _series(area, "winds", n, area_path) or [None] * n
+                waves = _series(area, "waves", n, area_path) or [None] * n
+                report.weathers.extend(
+                    WeatherRecord(code, name, times[k], codes[k], weathers[k], winds[k], waves[k]) for k in range(n))
+            if pops is not None:
+                report.pops.extend(PopRecord(code, name, times[k], to_int(pops[k])) for k in range(n))
+            if temps is not None:
+                report.temps.extend(TempRecord(code, name, times[k], to_int(temps[k])) for k in range(n))
+
+
+def _parse_weekly(block, report, path):
+    report.weekly_report_datetime = block.get("reportDatetime")
+    for i, ts in enumerate(_field(block, "timeSeries", list, path)):
+        ts_path = f"{path}.timeSeries[{i}]"
+        for area, code, name, times, area_path in _areas(ts, ts_path):
+            n = len(times)
+            codes = _series(area, "weatherCodes", n, area_path)
+            temps_min = _series(area, "tempsMin", n, area_path)
+            if codes is not None:
+                pops = _series(area, "pops", n, area_path) or [None] * n
+                rel = _series(area, "reliabilities", n, area_path) or [None] * n
+                report.weekly.extend(
+                    WeeklyRecord(code, name, times[k], codes[k], to_int(pops[k]), rel[k] or None) for k in range(n))
+            if temps_min is not None:
+                cols = [temps_min] + [_series(area, key, n, area_path) or [None] * n
+                                      for key in ("tempsMinLower", "tempsMinUpper",
+                                                  "tempsMax", "tempsMaxLower", "tempsMaxUpper")]
+                lo, lo_l, lo_u, hi, hi_l, hi_u = ([to_int(v) for v in c] for c in cols)
+                report.weekly_temps.extend(
+                    WeeklyTempRecord(code, name, times[k], lo[k], lo_l[k], lo_u[k], hi[k], hi_l[k], hi_u[k])
+                    for k in range(n))
+
+
+def parse(data):
+    """予報JSON（bytes / str / 読み込み済みのlist）を ForecastReport に変換する"""
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    doc = loads(data) if isinstance(data, (bytes, bytearray, str)) else data
+    if not isinstance(doc, list) or not doc:
+        raise ForecastParseError("$: expected non-empty list")
+
+    first = doc[0]
+    report = ForecastReport(first.get("publishingOffice") if isinstance(first, dict) else None,
+                            _field(first, "reportDatetime", str, "$[0]"))
+    _parse_short_term(first, report, "$[0]")
+    if len(doc) > 1:
+        _parse_weekly(doc[1], report, "$[1]")
+    return report
+
+
+def to_forecast_list(report, area_code=None):
+    """DB保存用の日別予報リストに変換する
+
+    area_code を省略した場合は最初の細分区域を使う。気温は最初の地点の値で、
+    00:00 の値を最低、09:00 の値を最高とし、3日間予報に無い日は週間予報で補う。
+    """
+    weathers = report.weathers
+    if not weathers:
+        return []
+    if area_code is None:
+        area_code = weathers[0].area_code
+    station = report.temps[0].station_code if report.temps else None
+    weekly_station = report.weekly_temps[0].station_code if report.weekly_temps else None
+
+    temps = {}
+    for t in report.weekly_temps:
+        if t.station_code == weekly_station:
+            temps[t.time[:10]] = [t.temp_min, t.temp_max]
+    for t in report.temps:
+        if t.station_code == station and t.temp is not None:
+            slot = temps.setdefault(t.time[:10], [None, None])
+            slot[0 if t.time[11:13] == "00" else 1] = t.temp
+
+    forecast_list = []
+    for w in weathers:
+        if w.area_code != area_code:
+            continue
+        date = w.time[:10]
+        temp_min, temp_max = temps.get(date, (None, None))
+        forecast_list.append({
+            "date": date,
+            "weather": w.weather,
+            "wind": w.wind,
+            "min": temp_min, "max": temp_max,
+            "report_datetime": report.report_datetime
+        })
+    return forecast_list
@@ -0,0 +1,74 @@
+"""予報の取得→解析→保存をまとめた処理と、UIから使う非同期の取得窓口"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from jma_api import FORECAST_TTL, FORECAST_URL, fetch_forecast, parse_forecast
+from metrics import metrics
+
+# 予報を同時に取得するスレッド数（全セッション合計）
+FETCH_WORKERS = 8
+
+
+def refresh_forecast(db, area_code, area_name, cache=None, session=None, forecast_url=FORECAST_URL,
+                     ttl=FORECAST_TTL):
+    """1エリアの予報を取得してDBに保存する（同期版）。戻り値は挿入した行数
+
+    ttl はキャッシュの有効期間（0 なら毎回サーバーに確認する）
+    """
+    # 取得（fetch）・解析（parse）・保存（save）の所要時間はそれぞれのスパンで記録する
+    with metrics.span("refresh", area=area_code):
+        forecasts = parse_forecast(fetch_forecast(area_code, session, forecast_url, cache, ttl))
+        with metrics.span("save", area=area_code):
+            return db.save_data(area_code, area_name, forecasts)
+
+
+class ForecastFetcher:
+    """UIのイベントループから使う非同期の予報取得
+
+    通信とJSON解析はスレッドプールで行うのでイベントループを止めない。同じ area_code の
+    取得が実行中なら新しく通信せず、実行中の取得の完了を待つ（リクエストの合流）。
+    合流はスレッドをまたいで行うので、1つの fetcher をプロセス内の全セッション
+    （別々のイベントループやスレッドからの呼び出し）で共有できる。
+    """
+
+    def __init__(self, db, cache=None, forecast_url=FORECAST_URL, max_workers=FETCH_WORKERS, session=None):
+        self.db = db
+        self.cache = cache
+        self.forecast_url = forecast_url
+        self.session = session
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ForecastFetcher")
+        self._in_flight = {}   # area_code -> concurrent.futures.Future
+        self._lock = threading.Lock()
+        self.started = 0
+        self.coalesced = 0
+
+    @property
+    def busy(self):
+        return bool(self._in_flight)
+
+    def submit(self, area_code, area_name):
+        """取得を開始し（実行中ならそれに合流し）Future を返す"""
+        with self._lock:
+            future = self._in_flight.get(area_code)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = self._executor.submit(refresh_forecast, self.db, area_code, area_name,
+                                           self.cache, self.session, self.forecast_url)
+            self._in_flight[area_code] = future
+            self.started += 1
+        future.add_done_callback(lambda _: self._done(area_code, future))
+        return future
+
+    def _done(self, area_code, future):
+        with self._lock:
+            if self._in_flight.get(area_code) is future:
+                del self._in_flight[area_code]
+
+    async def refresh(self, area_code, area_name):
+        # 待っている側がキャンセルされても、共有している取得処理は止めない
+        return await asyncio.shield(asyncio.wrap_future(self.submit(area_code, area_name)))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
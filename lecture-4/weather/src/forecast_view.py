@@ -0,0 +1,117 @@
+import threading
+
+import flet as ft
+
+from metrics import metrics
+
+# 履歴表示で1回に読み込む件数
+PAGE_SIZE = 50
+
+
+def get_weather_icons(weather_text):
+    icons = []
+    if "晴" in weather_text or "はれ" in weather_text:
+        icons.append(ft.Icon(ft.Icons.WB_SUNNY, color=ft.Colors.ORANGE, size=25))
+    if "曇" in weather_text or "くもり" in weather_text:
+        icons.append(ft.Icon(ft.Icons.CLOUD, color=ft.Colors.BLUE_GREY_400, size=25))
+    if "雨" in weather_text or "あめ" in weather_text:
+        icons.append(ft.Icon(ft.Icons.UMBRELLA, color=ft.Colors.BLUE_600, size=25))
+    return icons if icons else [ft.Icon(ft.Icons.QUESTION_MARK, color=ft.Colors.GREY_400)]
+
+
+def build_card(r):
+    """予報1行分のカードを作成"""
+    # row[3]:天気, row[2]:日付, row[5]:最低, row[6]:最高, row[4]:風, row[7]:取得時
+    icons = get_weather_icons(r[3])
+    temp_min = "-" if r[5] is None else r[5]
+    temp_max = "-" if r[6] is None else r[6]
+    temp_info = f"最低 {temp_min}℃ / 最高 {temp_max}℃"
+    return ft.Card(ft.Container(padding=15, content=ft.ExpansionTile(
+        leading=ft.Row(icons, spacing=5, tight=True),
+        title=ft.Text(f"{r[2]}", size=18, weight="bold"),
+        subtitle=ft.Text(f"{r[3]}　{temp_info}"),
+        controls=[
+            ft.ListTile(title=ft.Text("風の予報"), subtitle=ft.Text(r[4])),
+            ft.ListTile(title=ft.Text("取得日時"), subtitle=ft.Text(r[7]), text_color="grey")
+        ]
+    )))
+
+
+class ForecastView:
+    """予報の表示領域
+
+    保存済みの行は内容が変わらないので、行IDごとにカードを使い回し、新しい行の
+    カードだけを作る。履歴は ListView で表示し、PAGE_SIZE 件ずつキーセット方式で
+    読み込む。show / load_more はスレッドから呼ばれるので、ロックで1つずつ実行する。
+    """
+
+    def __init__(self, db, page_size=PAGE_SIZE):
+        self.db = db
+        self.page_size = page_size
+        self.title = ft.Text(style=ft.TextThemeStyle.HEADLINE_MEDIUM, weight="bold")
+        self.empty = ft.Text("データが見つかりません。地域を選び直してください。")
+        self.more = ft.TextButton("さらに読み込む", icon=ft.Icons.EXPAND_MORE, on_click=self.load_more)
+        self.control = ft.ListView(expand=True, spacing=15)
+        self._cards = {}      # row id -> Card
+        self._history = None  # 表示中の履歴 (area_code, date_str, 最後の行のキー)
+        self._lock = threading.Lock()
+
+    def _card(self, r):
+        card = self._cards.get(r[0])
+        return card if card is not None else build_card(r)
+
+    def show(self, area_code, area_name, date_filter=None, current=None):
+        """DBからデータを読み取って表示を更新する
+
+        current を渡すと表示を書き換える直前に呼び、False なら（その間に別の地域や日付が
+        選ばれていたら）何もしない。表示を更新したかどうかを返す。
+        """
+        with self._lock:
+            return self._show(area_code, area_name, date_filter, current)
+
+    def _show(self, area_code, area_name, date_filter, current):
+        # データの取得（日付指定があるか否か）
+        with metrics.span("query", area=area_code):
+            if date_filter:
+                rows = self.db.get_by_date(area_code, date_filter, limit=self.page_size)
+            else:
+                rows = self.db.get_latest(area_code)
+        if current is not None and not current():
+            return False
+        if date_filter:
+            self.title.value = f"{area_name} の予報履歴 ({date_filter})"
+        else:
+            self.title.value = f"{area_name} の最新予報 (DB)"
+
+        # カードの組み立てと page への反映（update）
+        with metrics.span("render", area=area_code, rows=len(rows)):
+            cards = [self._card(r) for r in rows]
+            self._cards = {r[0]: card for r, card in zip(rows, cards)}
+            self.control.controls = [self.title] + (cards or [self.empty])
+            self._history = None
+            if date_filter and len(rows) == self.page_size:
+                self._history = (area_code, date_filter, (rows[-1][7], rows[-1][0]))
+                self.control.controls.append(self.more)
+            self.control.update()
+        return True
+
+    def load_more(self, e=None):
+        """履歴の続きを読み込んで末尾に追加する"""
+        with self._lock:
+            self._load_more()
+
+    def _load_more(self):
+        if self._history is None:
+            return
+        area_code, date_filter, after = self._history
+        rows = self.db.get_by_date(area_code, date_filter, limit=self.page_size, after=after)
+        self.control.controls.remove(self.more)
+        for r in rows:
+            card = self._card(r)
+            self._cards[r[0]] = card
+            self.control.controls.append(card)
+        self._history = None
+        if len(rows) == self.page_size:
+            self._history = (area_code, date_filter, (rows[-1][7], rows[-1][0]))
+            self.control.controls.append(self.more)
+        self.control.update()
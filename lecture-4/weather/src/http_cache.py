@@ -0,0 +1,155 @@
+"""気象庁APIのレスポンスを保存する永続キャッシュ
+
+- TTL内のエントリはネットワークにアクセスせずに返す
+- TTLを過ぎたエントリは ETag / Last-Modified を付けた条件付きGETで再検証する
+- 合計サイズが max_bytes を超えたら最終アクセスが古いものから削除する (LRU)
+"""
+import sqlite3
+import threading
+import time
+
+import requests
+
+CACHE_DB_NAME = "http_cache.db"
+DEFAULT_TTL = 600                 # 10分
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+REQUEST_TIMEOUT = 10
+# ヒットのたびに last_access を書き込むので、コミットで fsync を待たない設定にする
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+]
+
+
+class CacheStats:
+    """キャッシュのヒット/ミスと節約できた通信量のカウンター"""
+
+    def __init__(self):
+        self.hits = 0            # TTL内でネットワークを使わずに返した回数
+        self.revalidated = 0     # 304 Not Modified で本文の転送を省略できた回数
+        self.misses = 0          # 本文をダウンロードした回数
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    @property
+    def round_trips_saved(self):
+        return self.hits
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "round_trips_saved": self.round_trips_saved,
+            "bytes_downloaded": self.bytes_downloaded,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+        }
+
+
+class HttpCache:
+    def __init__(self, db_name=CACHE_DB_NAME, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        for pragma in PRAGMAS:
+            self.conn.execute(pragma)
+        self.init_tables()
+
+    def init_tables(self):
+        cur = self.conn.cursor()
+        cur.execute('''CREATE TABLE IF NOT EXISTS responses (
+                        url TEXT PRIMARY KEY,
+                        body BLOB,
+                        etag TEXT,
+                        last_modified TEXT,
+                        fetched_at REAL,
+                        last_access REAL,
+                        size INTEGER)''')
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+        self.conn.commit()
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self.stats, name, getattr(self.stats, name) + delta)
+
+    def _lookup(self, url):
+        with self._lock:
+            cur = self.conn.cursor()
+            cur.execute("SELECT body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,))
+            return cur.fetchone()
+
+    def _touch(self, url, now, refreshed=False):
+        with self._lock:
+            if refreshed:
+                self.conn.execute("UPDATE responses SET last_access = ?, fetched_at = ? WHERE url = ?",
+                                  (now, now, url))
+            else:
+                self.conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (now, url))
+            self.conn.commit()
+
+    def _store(self, url, body, etag, last_modified, now):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                              (url, body, etag, last_modified, now, now, len(body)))
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        cur = self.conn.cursor()
+        total = cur.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 最終アクセスが古い順に、上限を下回るまで削除
+        for url, size in cur.execute("SELECT url, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            self.stats.evictions += 1
+
+    def get(self, url, session=None, ttl=None):
+        """URLの本文(bytes)を返す。必要な場合だけネットワークにアクセスする"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        cached = self._lookup(url)
+
+        if cached is not None and now - cached[3] < ttl:
+            self._count(hits=1, bytes_saved=len(cached[0]))
+            self._touch(url, now)
+            return cached[0]
+
+        headers = {}
+        if cached is not None:
+            if cached[1]:
+                headers["If-None-Match"] = cached[1]
+            if cached[2]:
+                headers["If-Modified-Since"] = cached[2]
+
+        http = session or requests
+        res = http.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        if res.status_code == 304 and cached is not None:
+            self._count(revalidated=1, bytes_saved=len(cached[0]))
+            self._touch(url, now, refreshed=True)
+            return cached[0]
+
+        res.raise_for_status()
+        body = res.content
+        self._count(misses=1, bytes_downloaded=len(body))
+        self._store(url, body, res.headers.get("ETag"), res.headers.get("Last-Modified"), now)
+        return body
+
+    def peek(self, url):
+        """保存済みの本文を期限に関係なく返す（オフライン用。無ければ None）"""
+        cached = self._lookup(url)
+        return None if cached is None else cached[0]
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
@@ -0,0 +1,49 @@
+import requests
+
+from forecast_parser import loads, parse, to_forecast_list
+from metrics import metrics
+
+# --- 定数 ---
+AREA_URL = "http://www.jma.go.jp/bosai/common/const/area.json"
+FORECAST_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/{}.json"
+REQUEST_TIMEOUT = 10
+AREA_TTL = 24 * 60 * 60      # area.json はほとんど変わらないので1日
+FORECAST_TTL = 10 * 60       # 予報は1日3回の発表なので10分
+
+
+def _get_bytes(url, session, cache, ttl):
+    if cache is not None:
+        return cache.get(url, session, ttl=ttl)
+    http = session or requests
+    res = http.get(url, timeout=REQUEST_TIMEOUT)
+    res.raise_for_status()
+    # キャッシュを使うときの通信量は HttpCache.stats で数える
+    metrics.count("http.requests")
+    metrics.count("http.bytes_downloaded", len(res.content))
+    return res.content
+
+
+def fetch_area(session=None, area_url=AREA_URL, cache=None):
+    """地域一覧 (area.json) を取得"""
+    with metrics.span("fetch_area"):
+        return loads(_get_bytes(area_url, session, cache, AREA_TTL))
+
+
+def fetch_forecast(area_code, session=None, forecast_url=FORECAST_URL, cache=None, ttl=FORECAST_TTL):
+    """指定エリアの予報JSONを取得（解析は parse_forecast で行うので bytes のまま返す）
+
+    ttl=0 ならキャッシュが新しくても必ず条件付きGETで再検証する
+    """
+    with metrics.span("fetch", area=area_code):
+        return _get_bytes(forecast_url.format(area_code), session, cache, ttl)
+
+
+def parse_forecast(res):
+    """予報JSON（bytes または読み込み済みのlist）を解析してDB保存用のリストを作成"""
+    with metrics.span("parse"):
+        return to_forecast_list(parse(res))
+
+
+def list_offices(area_raw):
+    """area.json から (office_code, office_name) の一覧を作成"""
+    return [(code, info["name"]) for code, info in area_raw["offices"].items()]
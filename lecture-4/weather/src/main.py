@@ -1,63 +1,34 @@
+import asyncio
+import os
+
 import flet as ft
-import requests
-import sqlite3
-from datetime import datetime
-
-# --- 定数 ---
-AREA_URL = "http://www.jma.go.jp/bosai/common/const/area.json"
-FORECAST_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/{}.json"
-DB_NAME = "weather_database.db"
-
-# --- データベース管理クラス ---
-class WeatherDB:
-    def __init__(self):
-        self.conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-        self.init_tables()
-
-    def init_tables(self):
-        cur = self.conn.cursor()
-        # エリア情報テーブル
-        cur.execute("CREATE TABLE IF NOT EXISTS areas (code TEXT PRIMARY KEY, name TEXT)")
-        # 予報データテーブル (created_atで履歴を管理)
-        cur.execute('''CREATE TABLE IF NOT EXISTS forecasts (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        area_code TEXT,
-                        forecast_date TEXT,
-                        weather TEXT,
-                        wind TEXT,
-                        temp_min TEXT,
-                        temp_max TEXT,
-                        created_at TEXT)''')
-        self.conn.commit()
-
-    def save_data(self, area_code, area_name, forecasts):
-        cur = self.conn.cursor()
-        # エリア情報の保存
-        cur.execute("INSERT OR REPLACE INTO areas VALUES (?, ?)", (area_code, area_name))
-        # 予報データの保存
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for f in forecasts:
-            cur.execute('''INSERT INTO forecasts (area_code, forecast_date, weather, wind, temp_min, temp_max, created_at)
-                           VALUES (?, ?, ?, ?, ?, ?, ?)''',
-                        (area_code, f['date'], f['weather'], f['wind'], f['min'], f['max'], now))
-        self.conn.commit()
-
-    def get_latest(self, area_code):
-        """特定のエリアの最新取得分（3日分）を取得"""
-        cur = self.conn.cursor()
-        cur.execute('''SELECT * FROM forecasts WHERE area_code = ? 
-                       ORDER BY created_at DESC LIMIT 3''', (area_code,))
-        return cur.fetchall()
-
-    def get_by_date(self, area_code, date_str):
-        """特定の日付の予報を履歴から検索"""
-        cur = self.conn.cursor()
-        cur.execute('''SELECT * FROM forecasts WHERE area_code = ? AND forecast_date = ? 
-                       ORDER BY created_at DESC''', (area_code, date_str))
-        return cur.fetchall()
-
-# DBインスタンスの生成
+
+from http_cache import HttpCache
+from area_index import SharedAreaIndex
+from area_menu import build_area_menu
+from forecast_service import FETCH_WORKERS, ForecastFetcher
+from forecast_view import ForecastView
+from metrics import metrics
+from prefetch import make_session, prefetch_all
+from scheduler import has_current_report
+from weather_db import WeatherDB
+
+# --- プロセス内の全セッションで共有する状態 ---
+# WEATHER_OFFLINE=1 なら通信せず、DBとキャッシュに保存済みのデータだけで動く
+OFFLINE = os.environ.get("WEATHER_OFFLINE") == "1"
+# WEATHER_DEBUG=1 なら計測値のパネルを表示する（計測の設定は metrics.py）
+DEBUG = os.environ.get("WEATHER_DEBUG") == "1"
+# DBインスタンスの生成（読み込みは接続プール、書き込みは専用スレッド）
 db = WeatherDB()
+# 古い履歴の間引きは scheduler.py / prefetch.py --compact で行う（起動のたびには行わない）
+# APIレスポンスのキャッシュ
+cache = HttpCache()
+# 地域インデックス（全セッションで1つ。取得できなければ保存済みのデータから作る）
+areas = SharedAreaIndex(cache, db=db, offline=OFFLINE)
+# 予報の非同期取得（同じ地域の同時取得はセッションをまたいで1回にまとめる）
+fetcher = ForecastFetcher(db, cache, session=make_session(FETCH_WORKERS))
+metrics.add_source("cache", cache.stats.as_dict)
+metrics.add_source("fetcher", lambda: {"started": fetcher.started, "coalesced": fetcher.coalesced})
 
 def main(page: ft.Page):
     page.title = "お天気マスター Pro + SQLite Storage"
@@ -66,107 +37,123 @@ def main(page: ft.Page):
 
     # 状態管理用
     selected_area_code = ft.Ref[str]()
+    selected_area_name = ft.Ref[str]()
+
+    view = ForecastView(db)
+    loading = ft.ProgressBar(visible=False)
+    # 表示中のビューの番号（後から来た古い取得結果で表示を上書きしないため）
+    view_seq = [0]
+    # このセッションで取得待ちの数（ProgressBar の表示用）
+    pending = [0]
+    # 計測値のパネル（WEATHER_DEBUG=1 のときだけ表示）
+    debug_text = ft.Text(size=11, font_family="monospace", selectable=True)
+    debug_panel = ft.Container(
+        content=ft.Column([
+            ft.Row([ft.Text("計測", weight="bold"),
+                    ft.TextButton("プロファイルを保存", on_click=lambda _: on_dump_profile(),
+                                  disabled=metrics.profiler is None)]),
+            debug_text,
+        ], spacing=2),
+        visible=DEBUG, bgcolor=ft.Colors.BLUE_GREY_100, padding=10, border_radius=8,
+    )
 
-    def get_weather_icons(weather_text):
-        icons = []
-        if "晴" in weather_text or "はれ" in weather_text:
-            icons.append(ft.Icon(ft.Icons.WB_SUNNY, color=ft.Colors.ORANGE, size=25))
-        if "曇" in weather_text or "くもり" in weather_text:
-            icons.append(ft.Icon(ft.Icons.CLOUD, color=ft.Colors.BLUE_GREY_400, size=25))
-        if "雨" in weather_text or "あめ" in weather_text:
-            icons.append(ft.Icon(ft.Icons.UMBRELLA, color=ft.Colors.BLUE_600, size=25))
-        return icons if icons else [ft.Icon(ft.Icons.QUESTION_MARK, color=ft.Colors.GREY_400)]
-
-    main_content = ft.Column(expand=True, scroll=ft.ScrollMode.AUTO, spacing=15)
-
-    def render_view(area_code, area_name, date_filter=None):
-        """DBからデータを読み取って表示を更新する共通関数"""
-        main_content.controls.clear()
-        
-        # データの取得（日付指定があるか否か）
-        if date_filter:
-            rows = db.get_by_date(area_code, date_filter)
-            title = f"{area_name} の予報履歴 ({date_filter})"
-        else:
-            rows = db.get_latest(area_code)
-            title = f"{area_name} の最新予報 (DB)"
-
-        main_content.controls.append(ft.Text(title, style=ft.TextThemeStyle.HEADLINE_MEDIUM, weight="bold"))
-
-        if not rows:
-            main_content.controls.append(ft.Text("データが見つかりません。地域を選び直してください。"))
-        else:
-            for r in rows:
-                # row[3]:天気, row[2]:日付, row[5]:最低, row[6]:最高, row[4]:風, row[7]:取得時
-                icons = get_weather_icons(r[3])
-                temp_info = f"最低 {r[5]}℃ / 最高 {r[6]}℃"
-                main_content.controls.append(
-                    ft.Card(ft.Container(padding=15, content=ft.ExpansionTile(
-                        leading=ft.Row(icons, spacing=5, tight=True),
-                        title=ft.Text(f"{r[2]}", size=18, weight="bold"),
-                        subtitle=ft.Text(f"{r[3]}　{temp_info}"),
-                        controls=[
-                            ft.ListTile(title=ft.Text("風の予報"), subtitle=ft.Text(r[4])),
-                            ft.ListTile(title=ft.Text("取得日時"), subtitle=ft.Text(r[7]), text_color="grey")
-                        ]
-                    )))
-                )
-        page.update()
+    def update_debug():
+        if DEBUG:
+            debug_text.value = metrics.summary()
+            debug_panel.update()
+
+    def is_current(seq):
+        """seq が表示中のビューの番号のままか（ForecastView.show の current に渡す）"""
+        return lambda: seq == view_seq[0]
+
+    def on_dump_profile():
+        path = metrics.dump_profile()
+        page.open(ft.SnackBar(ft.Text(f"{path} に保存しました" if path else "まだ計測結果がありません")))
 
-    def on_area_click(e):
+    async def on_area_click(e):
         area_code, area_name = e.control.data, e.control.title.value
         selected_area_code.current = area_code
-        
-        # 1. APIから最新データを取得
+        selected_area_name.current = area_name
+        view_seq[0] += 1
+        seq = view_seq[0]
+
+        # 1. まずDBに保存済みの予報をすぐに表示
+        # （DBの読み込みはスレッドで行い、他のセッションのイベント処理を止めない）
+        loading.visible = True
+        loading.update()
+        await asyncio.to_thread(view.show, area_code, area_name, current=is_current(seq))
+
+        # 2. APIから最新データを取得→解析→DBに保存（スレッドで実行し、同じ地域の取得は合流）
+        #    直近の発表が保存済み（scheduler.py が取得済み）かオフラインなら通信しない
+        if OFFLINE or await asyncio.to_thread(has_current_report, db, area_code):
+            loading.visible = pending[0] > 0
+            loading.update()
+            update_debug()
+            return
+        pending[0] += 1
         try:
-            res = requests.get(FORECAST_URL.format(area_code)).json()
-            
-            # 2. JSONを解析してDB用データを作成
-            weather_ts = res[0]["timeSeries"][0]
-            temp_data = []
-            for ts in res[0]["timeSeries"]:
-                if "temps" in ts["areas"][0]:
-                    temp_data = ts["areas"][0]["temps"]
-                    break
-            
-            forecast_list = []
-            for i in range(len(weather_ts["areas"][0]["weathers"])):
-                min_t = temp_data[i*2] if len(temp_data) > i*2 else "-"
-                max_t = temp_data[i*2+1] if len(temp_data) > i*2+1 else "-"
-                forecast_list.append({
-                    "date": weather_ts["timeDefines"][i][:10],
-                    "weather": weather_ts["areas"][0]["weathers"][i],
-                    "wind": weather_ts["areas"][0]["winds"][i],
-                    "min": min_t, "max": max_t
-                })
-            
-            # 3. DBに保存（ここでJSONからDBへ移行完了）
-            db.save_data(area_code, area_name, forecast_list)
-            
+            await fetcher.refresh(area_code, area_name)
         except Exception as ex:
-            print(f"Fetch Error: {ex}")
+            metrics.error("fetch", ex, area=area_code)
+        pending[0] -= 1
+        loading.visible = pending[0] > 0
+        loading.update()
 
-        # 4. 表示（常にDBから読み出す）
-        render_view(area_code, area_name)
+        # 3. 表示を更新（その間に別の地域や日付が選ばれていたら結果は捨てる）
+        if seq == view_seq[0]:
+            await asyncio.to_thread(view.show, area_code, area_name, current=is_current(seq))
+        update_debug()
 
     # 日付選択（オプション機能）
     def on_date_change(e):
         if selected_area_code.current:
             date_str = e.control.value.strftime("%Y-%m-%d")
-            render_view(selected_area_code.current, "履歴検索", date_filter=date_str)
+            view_seq[0] += 1
+            view.show(selected_area_code.current, "履歴検索", date_filter=date_str,
+                      current=is_current(view_seq[0]))
+            update_debug()
+
+    # 全地域の一括更新（バックグラウンドで並列取得）
+    def on_refresh_all(e):
+        e.control.disabled = True
+        page.update()
+
+        def worker():
+            try:
+                report = prefetch_all(db, cache=cache)
+                message = f"{report.ok_count}地域を更新しました（{report.wall_time:.1f}秒）"
+            except Exception as ex:
+                metrics.error("prefetch", ex)
+                message = "一括更新に失敗しました"
+            e.control.disabled = False
+            page.open(ft.SnackBar(ft.Text(message)))
+            # 一括更新の間に選ばれた地域を表示し直す（その後で別の地域が選ばれたら捨てる）
+            seq = view_seq[0]
+            if selected_area_code.current:
+                view.show(selected_area_code.current, selected_area_name.current, current=is_current(seq))
+            update_debug()
+            page.update()
+
+        page.run_thread(worker)
 
     datepicker = ft.DatePicker(on_change=on_date_change)
     page.overlay.append(datepicker)
 
     # --- UI構築 ---
-    area_raw = requests.get(AREA_URL).json()
-    area_menu = ft.Column(scroll=ft.ScrollMode.AUTO)
-    for c_code, c_info in area_raw["centers"].items():
-        state_tiles = [
-            ft.ListTile(title=ft.Text(area_raw["offices"][ch]["name"]), on_click=on_area_click, data=ch)
-            for ch in c_info["children"] if ch in area_raw["offices"]
-        ]
-        area_menu.controls.append(ft.ExpansionTile(title=ft.Text(c_info["name"]), controls=state_tiles))
+    # 共有の地域インデックスをすぐに表示する（プロセスで最初の1回だけファイルを読むか取得する）
+    area_index = areas.get()
+    area_menu = ft.Column(build_area_menu(area_index, on_area_click), scroll=ft.ScrollMode.AUTO)
+
+    # 地域インデックスの最新化（バックグラウンド。取得は全セッションで1回）
+    def refresh_area_menu():
+        try:
+            fresh = areas.refresh()
+        except Exception as ex:
+            metrics.error("area_refresh", ex)
+            return
+        if fresh is not area_index:
+            area_menu.controls = build_area_menu(fresh, on_area_click)
+            area_menu.update()
 
     page.add(
         ft.Row([
@@ -177,12 +164,17 @@ def main(page: ft.Page):
             ft.Container(
                 content=ft.Column([
                     ft.ElevatedButton("日付で履歴を検索", icon=ft.Icons.EVENT, on_click=lambda _: datepicker.pick_date()),
+                    ft.ElevatedButton("全地域を一括更新", icon=ft.Icons.REFRESH, on_click=on_refresh_all,
+                                      disabled=OFFLINE),
                     ft.Divider(),
                     area_menu
                 ]), width=220, bgcolor=ft.Colors.WHITE, padding=10
             ),
-            ft.Container(content=main_content, expand=True, padding=20)
+            ft.Container(content=ft.Column([loading, view.control, debug_panel], expand=True),
+                         expand=True, padding=20)
         ], expand=True)
     )
+    if areas.stale:
+        page.run_thread(refresh_area_menu)
 
 ft.app(target=main)
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""処理ごとの所要時間（スパン）とカウンターの計測
+
+    from metrics import metrics
+    with metrics.span("fetch", area="130000"):
+        ...
+    metrics.count("db.rows_written", 3)
+    metrics.error("fetch", ex)            # ログに出してエラー数を数える
+    metrics.snapshot()                    # {"spans": {...}, "counters": {...}, ...}
+
+計測は常に行い、結果はメモリ上の集計（回数・合計・最大・直近の p50 / p95）だけに持つ。
+環境変数で次を有効にできる:
+
+    WEATHER_METRICS=metrics.jsonl       スパンとエラーを1件1行の JSON で追記する
+    WEATHER_DEBUG=1                     アプリに計測値のパネルを表示する（main.py）
+    WEATHER_PROFILE=cprofile            スパンの中を cProfile で計測する
+    WEATHER_PROFILE=tracemalloc         メモリの確保を tracemalloc で記録する
+    WEATHER_PROFILE_OUT=weather_profile 出力先（.prof / .txt を付ける）。終了時と dump_profile() で書く
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# p50 / p95 の計算に使う、スパンごとの直近の件数
+RECENT_SAMPLES = 512
+PROFILE_OUT = "weather_profile"
+TRACEMALLOC_FRAMES = 10
+TRACEMALLOC_TOP = 30
+
+log = logging.getLogger("weather")
+
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class SpanStats:
+    """1種類のスパンの集計（秒）"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def add(self, elapsed, failed):
+        self.count += 1
+        self.errors += failed
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.recent.append(elapsed)
+
+    def as_dict(self):
+        return {"count": self.count, "errors": self.errors,
+                "avg_ms": round(self.total / self.count * 1000, 3),
+                "p50_ms": round(_percentile(self.recent, 0.50) * 1000, 3),
+                "p95_ms": round(_percentile(self.recent, 0.95) * 1000, 3),
+                "max_ms": round(self.max * 1000, 3)}
+
+
+class Profiler:
+    """WEATHER_PROFILE の計測。cProfile はスパンごとにスレッド内で有効にして結果を足し合わせる"""
+
+    def __init__(self, mode, out=PROFILE_OUT):
+        if mode not in ("cprofile", "tracemalloc"):
+            raise ValueError(f"unknown WEATHER_PROFILE {mode!r} (choose cprofile or tracemalloc)")
+        self.mode = mode
+        self.out = out
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = None     # pstats.Stats（cProfile の結果の合計）
+        self.skipped = 0       # 他のプロファイラが動いていて計測できなかったスパン
+        if mode == "tracemalloc":
+            import tracemalloc
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @contextmanager
+    def profile(self):
+        # 入れ子のスパンや tracemalloc では外側だけで計測する
+        if self.mode != "cprofile" or getattr(self._local, "active", False):
+            yield
+            return
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12 以降は同時に1つしか有効にできない（別のスレッドが計測中）
+            self.skipped += 1
+            yield
+            return
+        self._local.active = True
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._local.active = False
+            self._merge(profile)
+
+    def _merge(self, profile):
+        import pstats
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def dump(self):
+        """結果をファイルに書いて、書いたパスを返す（まだ何も無ければ None）"""
+        if self.mode == "tracemalloc":
+            import tracemalloc
+            path = self.out + ".txt"
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"current {current / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB\n")
+                for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                    f.write(f"{stat}\n")
+            return path
+        with self._lock:
+            if self._stats is None:
+                return None
+            path = self.out + ".prof"
+            self._stats.dump_stats(path)
+        return path
+
+
+class Metrics:
+    def __init__(self, path=None, profiler=None):
+        """path: スパンとエラーを JSON Lines で追記するファイル（None なら書かない）"""
+        self.path = path
+        self.profiler = profiler
+        self.spans = {}       # name -> SpanStats
+        self.counters = {}    # name -> int
+        self.sources = {}     # name -> 値の dict を返す関数（HttpCache.stats.as_dict など）
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        mode = environ.get("WEATHER_PROFILE")
+        profiler = Profiler(mode, environ.get("WEATHER_PROFILE_OUT", PROFILE_OUT)) if mode else None
+        return cls(environ.get("WEATHER_METRICS"), profiler)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """with の中の所要時間を name として記録する（attrs は JSON Lines にだけ書く）"""
+        profile = self.profiler.profile() if self.profiler else _NO_PROFILE
+        start = time.perf_counter()
+        failed = False
+        try:
+            with profile:
+                yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self._record(name, time.perf_counter() - start, failed, attrs)
+
+    def _record(self, name, elapsed, failed, attrs):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.add(elapsed, failed)
+        self._write({"span": name, "ms": round(elapsed * 1000, 3), "ok": not failed, **attrs})
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def error(self, stage, ex, **attrs):
+        """失敗をログに出し、errors.<stage> を数える（print の代わり）"""
+        log.warning("%s failed: %s", stage, ex)
+        self.count(f"errors.{stage}")
+        self._write({"error": stage, "type": type(ex).__name__, "message": str(ex), **attrs})
+
+    def add_source(self, name, fn):
+        """snapshot() に含める外部のカウンター（呼ぶと dict を返す関数）"""
+        self.sources[name] = fn
+
+    def _write(self, record):
+        if self.path is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), **record}, ensure_ascii=False)
+        # close() が別のスレッドで _file を閉じることがあるので、確認もロックの中で行う
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._file.write(line + "\n")
+                self._file.flush()
+            except OSError:
+                # ディスクが一杯などで書けなくても、計測している処理（DBのコミットなど）は止めない
+                self.counters["errors.metrics_write"] = self.counters.get("errors.metrics_write", 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            data = {"spans": {name: s.as_dict() for name, s in self.spans.items()},
+                    "counters": dict(self.counters)}
+        for name, fn in self.sources.items():
+            data[name] = fn()
+        return data
+
+    def summary(self):
+        """snapshot() を表示用の複数行の文字列にする"""
+        snap = self.snapshot()
+        lines = [f"{name:<10} n={s['count']:<5} p50 {s['p50_ms']:>8.1f}ms  p95 {s['p95_ms']:>8.1f}ms  "
+                 f"max {s['max_ms']:>8.1f}ms" for name, s in sorted(snap.pop("spans").items())]
+        for group, values in snap.items():
+            if values:
+                lines.append(f"{group}: " + ", ".join(f"{k}={v}" for k, v in sorted(values.items())))
+        return "\n".join(lines)
+
+    def dump_profile(self):
+        return self.profiler.dump() if self.profiler else None
+
+    def close(self):
+        """最後の集計を書いて終わる（終了時に自動で呼ばれる）"""
+        if self._file is not None:
+            self._write({"snapshot": self.snapshot()})
+            with self._lock:
+                self._file.close()
+                self._file = None
+        path = self.dump_profile()
+        if path:
+            log.warning("profile written to %s", path)
+
+
+class _NoProfile:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_PROFILE = _NoProfile()
+
+# プロセス全体で1つ
+metrics = Metrics.from_env()
+atexit.register(metrics.close)
@@ -0,0 +1,115 @@
+"""全予報区（office）の予報を並列で取得してDBへ一括保存する
+
+使い方:
+    python prefetch.py [--workers 8] [--area-url URL] [--forecast-url URL] [--db PATH] [--compact]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import CACHE_DB_NAME, HttpCache
+from jma_api import AREA_URL, FORECAST_URL, fetch_area, fetch_forecast, list_offices, parse_forecast
+from weather_db import DB_NAME, WeatherDB
+
+DEFAULT_WORKERS = 8
+
+
+def make_session(pool_size=DEFAULT_WORKERS):
+    """スレッド間で共有する接続プール付きセッションを作成"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class PrefetchReport:
+    """一括取得の結果（エリアごとの所要時間と全体の経過時間）"""
+
+    def __init__(self):
+        self.latencies = {}   # area_code -> 秒
+        self.errors = {}      # area_code -> エラーメッセージ
+        self.rows_written = 0
+        self.wall_time = 0.0
+
+    @property
+    def ok_count(self):
+        return len(self.latencies) - len(self.errors)
+
+    def summary(self):
+        ok = [t for code, t in self.latencies.items() if code not in self.errors]
+        lines = [f"offices: {len(self.latencies)}  ok: {self.ok_count}  errors: {len(self.errors)}  "
+                 f"rows: {self.rows_written}  wall: {self.wall_time:.3f}s"]
+        if ok:
+            lines.append(f"latency min/avg/max: {min(ok):.3f}s / {sum(ok) / len(ok):.3f}s / {max(ok):.3f}s")
+        for code, msg in sorted(self.errors.items()):
+            lines.append(f"  {code}: {msg}")
+        return "\n".join(lines)
+
+
+def _fetch_one(session, area_code, forecast_url, cache):
+    start = time.perf_counter()
+    try:
+        forecasts = parse_forecast(fetch_forecast(area_code, session, forecast_url, cache))
+        return area_code, forecasts, time.perf_counter() - start, None
+    except Exception as ex:
+        return area_code, None, time.perf_counter() - start, str(ex)
+
+
+def prefetch_offices(db, offices, forecast_url=FORECAST_URL, max_workers=DEFAULT_WORKERS, session=None,
+                     cache=None):
+    """offices: (area_code, area_name) のリスト。取得後に1トランザクションで保存する"""
+    report = PrefetchReport()
+    names = dict(offices)
+    own_session = session is None
+    session = session or make_session(max_workers)
+    start = time.perf_counter()
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_fetch_one, session, code, forecast_url, cache) for code in names]
+            for fut in as_completed(futures):
+                code, forecasts, elapsed, error = fut.result()
+                report.latencies[code] = elapsed
+                if error is not None:
+                    report.errors[code] = error
+                else:
+                    results.append((code, names[code], forecasts))
+    finally:
+        if own_session:
+            session.close()
+
+    report.rows_written = db.save_many(results)
+    report.wall_time = time.perf_counter() - start
+    return report
+
+
+def prefetch_all(db, area_url=AREA_URL, forecast_url=FORECAST_URL, max_workers=DEFAULT_WORKERS, cache=None):
+    """area.json に載っている全officeの予報を取得して保存する"""
+    with make_session(max_workers) as session:
+        offices = list_offices(fetch_area(session, area_url, cache))
+        return prefetch_offices(db, offices, forecast_url, max_workers, session, cache)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="全officeの予報を並列取得してDBに保存")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--area-url", default=AREA_URL)
+    parser.add_argument("--forecast-url", default=FORECAST_URL)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--cache-db", default=CACHE_DB_NAME)
+    parser.add_argument("--no-cache", action="store_true", help="レスポンスキャッシュを使わない")
+    parser.add_argument("--compact", action="store_true", help="保存後に古い履歴を間引く")
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else HttpCache(args.cache_db)
+    db = WeatherDB(args.db)
+    report = prefetch_all(db, args.area_url, args.forecast_url, args.workers, cache)
+    print(report.summary())
+    if args.compact:
+        print(f"compacted: {db.compact()} rows deleted")
+    if cache is not None:
+        print(f"cache: {cache.stats.as_dict()}")
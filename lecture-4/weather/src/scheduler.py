@@ -0,0 +1,265 @@
+"""気象庁の発表時刻（5時・11時・17時 JST）に予報を取得する常駐スケジューラ
+
+使い方:
+    python scheduler.py                    # 一度でも表示した地域（areas テーブル）を更新
+    python scheduler.py --areas 130000 270000
+    python scheduler.py --all --once       # 全officeを今すぐ1回だけ更新
+
+発表の少し後（PUBLISH_DELAY）に各地域を refresh_forecast で取得・保存する。
+まだ新しい発表が出ていない・通信に失敗した地域は、ジッター付きの指数バックオフで
+やり直す。起動時にDBが前回の発表より古ければ、すぐに1回取得する。
+取得の後、前回から1日以上たっていれば古い履歴を間引く（WeatherDB.compact_if_due）。
+実行の統計は stats（SchedulerStats）と --stats-file の JSON で確認できる。
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from area_index import iter_offices, load_index, refresh_index
+from forecast_service import refresh_forecast
+from http_cache import CACHE_DB_NAME, HttpCache
+from jma_api import AREA_URL, FORECAST_URL
+from prefetch import DEFAULT_WORKERS, make_session
+from weather_db import DB_NAME, WeatherDB
+
+JST = timezone(timedelta(hours=9), "JST")
+PUBLISH_HOURS = (5, 11, 17)
+# 発表時刻からこれだけ待って取得する（データが配信されるまでの余裕）
+PUBLISH_DELAY = timedelta(minutes=5)
+MAX_RETRIES = 5
+BACKOFF_BASE = 30.0     # 秒。やり直すたびに2倍
+BACKOFF_MAX = 15 * 60.0
+STATS_FILE = "scheduler_stats.json"
+
+
+def last_publication(now=None):
+    """now 以前で最後の発表時刻（JST）"""
+    now = (now or datetime.now(JST)).astimezone(JST)
+    for day in (0, 1):
+        base = (now - timedelta(days=day)).replace(minute=0, second=0, microsecond=0)
+        for hour in reversed(PUBLISH_HOURS):
+            slot = base.replace(hour=hour)
+            if slot <= now:
+                return slot
+    raise AssertionError("unreachable")
+
+
+def next_run(now=None):
+    """now より後で次に取得を行う時刻（発表時刻 + PUBLISH_DELAY）"""
+    now = (now or datetime.now(JST)).astimezone(JST)
+    for day in (0, 1):
+        base = (now + timedelta(days=day)).replace(minute=0, second=0, microsecond=0)
+        for hour in PUBLISH_HOURS:
+            at = base.replace(hour=hour) + PUBLISH_DELAY
+            if at > now:
+                return at
+    raise AssertionError("unreachable")
+
+
+def has_current_report(db, area_code, now=None):
+    """DBにその地域の最新の発表（now 以前で最後の発表時刻以降）が保存済みか"""
+    latest = db.latest_report(area_code)
+    return latest is not None and latest >= last_publication(now).isoformat()
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX, rng=random):
+    """attempt 回目のやり直しまでの待ち時間（full jitter: 0 〜 base * 2**attempt の一様乱数）"""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class NotPublishedYet(Exception):
+    """取得できたが、まだ直近の発表より古い予報だった"""
+
+
+class SchedulerStats:
+    """スケジューラの実行統計（全実行の合計と直近の実行）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.areas_ok = 0
+        self.areas_failed = 0
+        self.retries = 0
+        self.rows_written = 0
+        self.last_run = None      # 直近の実行の dict
+        self.next_run = None      # 次の実行予定（ISO形式）
+
+    def record(self, run):
+        with self._lock:
+            self.runs += 1
+            self.areas_ok += run["ok"]
+            self.areas_failed += len(run["failed"])
+            self.retries += run["retries"]
+            self.rows_written += run["rows_written"]
+            self.last_run = run
+
+    def as_dict(self):
+        with self._lock:
+            return {"runs": self.runs, "areas_ok": self.areas_ok, "areas_failed": self.areas_failed,
+                    "retries": self.retries, "rows_written": self.rows_written,
+                    "last_run": self.last_run, "next_run": self.next_run}
+
+
+class RefreshScheduler:
+    def __init__(self, db, areas, cache=None, forecast_url=FORECAST_URL, max_workers=DEFAULT_WORKERS,
+                 max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 stats_file=None):
+        """areas: 更新する (area_code, area_name) のリスト、または呼ぶたびにそれを返す関数"""
+        self.db = db
+        self.areas = areas
+        self.cache = cache
+        self.forecast_url = forecast_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats_file = stats_file
+        self.stats = SchedulerStats()
+        self._stop = threading.Event()
+        self._rng = random.Random()
+
+    def _subscribed(self):
+        return list(self.areas() if callable(self.areas) else self.areas)
+
+    def refresh_area(self, session, area_code, area_name, slot):
+        """1地域を取得・保存する。失敗したらバックオフしてやり直す。戻り値は (行数, やり直し回数)
+
+        最後まで失敗したときの例外には、実際にやり直した回数を retries として付ける。
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                # 発表前の本文がキャッシュに残っていても使わず、毎回サーバーに確認する（条件付きGET）
+                rows = refresh_forecast(self.db, area_code, area_name, self.cache, session, self.forecast_url,
+                                        ttl=0)
+                if not has_current_report(self.db, area_code, slot):
+                    raise NotPublishedYet(f"{area_code}: no report for {slot:%H:%M} yet")
+                return rows, attempt
+            except Exception as ex:
+                if attempt == self.max_retries:
+                    ex.retries = attempt
+                    raise
+            # 停止を指示されたら待たずに終わる
+            if self._stop.wait(backoff_delay(attempt, self.backoff_base, self.backoff_max, self._rng)):
+                ex = InterruptedError("scheduler stopped")
+                ex.retries = attempt
+                raise ex
+
+    def run_once(self, now=None):
+        """購読中の全地域を1回更新して、その実行の統計を返す"""
+        slot = last_publication(now)
+        areas = self._subscribed()
+        start = time.perf_counter()
+        run = {"started": datetime.now(JST).isoformat(timespec="seconds"), "publication": slot.isoformat(),
+               "areas": len(areas), "ok": 0, "failed": {}, "retries": 0, "rows_written": 0}
+        with make_session(self.max_workers) as session, ThreadPoolExecutor(self.max_workers) as pool:
+            futures = {code: pool.submit(self.refresh_area, session, code, name, slot) for code, name in areas}
+            for code, future in futures.items():
+                try:
+                    rows, retries = future.result()
+                except Exception as ex:
+                    run["failed"][code] = str(ex)
+                    run["retries"] += getattr(ex, "retries", 0)
+                    continue
+                run["ok"] += 1
+                run["retries"] += retries
+                run["rows_written"] += rows
+        run["wall_time"] = round(time.perf_counter() - start, 3)
+        self.stats.record(run)
+        self._write_stats()
+        return run
+
+    def _write_stats(self):
+        if not self.stats_file:
+            return
+        tmp = self.stats_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.stats.as_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.stats_file)
+
+    def is_stale(self, now=None):
+        return any(not has_current_report(self.db, code, now) for code, _ in self._subscribed())
+
+    def run_forever(self):
+        """発表時刻ごとに run_once する（stop() で止まる）"""
+        if self.is_stale():
+            print(summary(self.run_once()))
+        while not self._stop.is_set():
+            at = next_run()
+            self.stats.next_run = at.isoformat()
+            self._write_stats()
+            if self._stop.wait(max(0.0, (at - datetime.now(JST)).total_seconds())):
+                break
+            print(summary(self.run_once()))
+            # 古い履歴の間引きは1日1回、取得の後に行う
+            deleted = self.db.compact_if_due()
+            if deleted is not None:
+                print(f"compacted: {deleted} rows deleted")
+
+    def start(self):
+        """バックグラウンドのスレッドで run_forever する"""
+        thread = threading.Thread(target=self.run_forever, name="RefreshScheduler", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def summary(run):
+    """run_once() の結果を表示用の文字列にする"""
+    lines = [f"[{run['started']}] publication {run['publication']}: {run['ok']}/{run['areas']} ok, "
+             f"{run['rows_written']} rows, {run['retries']} retries, {run['wall_time']}s"]
+    for code, msg in sorted(run["failed"].items()):
+        lines.append(f"  {code}: {msg}")
+    return "\n".join(lines)
+
+
+def stored_areas(db):
+    """一度でも保存した地域（UIで表示した地域）を購読中とみなす"""
+    with db.reader() as conn:
+        return conn.execute("SELECT code, name FROM areas ORDER BY code").fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="発表時刻ごとに予報を取得してDBに保存")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--areas", nargs="+", metavar="CODE", help="更新するofficeのコード")
+    group.add_argument("--all", action="store_true", help="全officeを更新する")
+    parser.add_argument("--once", action="store_true", help="1回だけ更新して終わる")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--area-url", default=AREA_URL)
+    parser.add_argument("--forecast-url", default=FORECAST_URL)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--cache-db", default=CACHE_DB_NAME)
+    parser.add_argument("--no-cache", action="store_true", help="レスポンスキャッシュを使わない")
+    parser.add_argument("--stats-file", default=STATS_FILE)
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else HttpCache(args.cache_db)
+    db = WeatherDB(args.db)
+    if args.areas or args.all:
+        index = load_index() or refresh_index(cache, args.area_url)
+        offices = list(iter_offices(index))
+        if args.areas:
+            names = dict(offices)
+            offices = [(code, names.get(code, code)) for code in args.areas]
+        areas = offices
+    else:
+        areas = lambda: stored_areas(db)   # noqa: E731  UIで新しく表示した地域も次回から対象にする
+
+    scheduler = RefreshScheduler(db, areas, cache, args.forecast_url, args.workers, stats_file=args.stats_file)
+    try:
+        if args.once:
+            print(summary(scheduler.run_once()))
+        else:
+            print(f"next run: {next_run().isoformat()}")
+            scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    finally:
+        db.close()
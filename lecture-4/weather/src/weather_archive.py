@@ -0,0 +1,175 @@
+"""予報履歴の一括エクスポート・インポートと、古いDBファイルの統合
+
+使い方:
+    python weather_archive.py export history.jsonl.gz
+    python weather_archive.py import history.jsonl.gz
+    python weather_archive.py merge ../../../weather_forecast.db ../../../weather_app_v2.db
+
+ファイルは gzip（拡張子 .zst なら zstd。要 zstandard）で圧縮した JSON Lines。
+1行目はヘッダで、以降の1行が CHUNK_ROWS 行ぶんのブロックになる。ブロックは列ごとの
+配列で持つ（列指向なので同じ値が並び、よく圧縮される）:
+
+    {"format": "weather-archive", "version": 1}
+    {"table": "areas", "columns": {"code": [...], "name": [...]}}
+    {"table": "forecasts", "columns": {"area_code": [...], "forecast_date": [...], ...}}
+
+読み書きともブロック単位で流すので、履歴が何GBあっても全体をメモリに載せない。
+インポートとマージはすでにある行を挿入しないので、何度実行しても同じ結果になる。
+"""
+import argparse
+import gzip
+import json
+import sqlite3
+
+from forecast_parser import loads
+from weather_db import DB_NAME, WeatherDB
+
+try:
+    import zstandard
+except ImportError:  # zstd は任意（pip install zstandard）
+    zstandard = None
+
+FORMAT = "weather-archive"
+VERSION = 1
+CHUNK_ROWS = 10000
+AREA_COLUMNS = ("code", "name")
+FORECAST_COLUMNS = ("area_code", "forecast_date", "weather", "wind", "temp_min", "temp_max",
+                    "created_at", "report_datetime")
+
+
+def open_archive(path, mode):
+    """拡張子に合わせて圧縮ファイルをテキストモードで開く（mode は "r" か "w"）"""
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("zstd archives need the zstandard package (pip install zstandard)")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+
+
+def _chunks(cur, size):
+    while True:
+        rows = cur.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def _write_block(f, table, columns, rows):
+    block = {"table": table, "columns": dict(zip(columns, map(list, zip(*rows))))}
+    f.write(json.dumps(block, ensure_ascii=False, separators=(",", ":")))
+    f.write("\n")
+
+
+def export_archive(db, path, chunk_rows=CHUNK_ROWS):
+    """DBの areas と forecasts をファイルに書き出す。戻り値は {テーブル: 行数}"""
+    counts = {"areas": 0, "forecasts": 0}
+    # 1つの読み込み接続で読むので、書き出し中に保存された行が混ざらない（WALのスナップショット）
+    with db.reader() as conn, open_archive(path, "w") as f:
+        f.write(json.dumps({"format": FORMAT, "version": VERSION}) + "\n")
+        conn.execute("BEGIN")
+        try:
+            for table, columns in (("areas", AREA_COLUMNS), ("forecasts", FORECAST_COLUMNS)):
+                order = "code" if table == "areas" else "id"
+                cur = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {order}")
+                for rows in _chunks(cur, chunk_rows):
+                    _write_block(f, table, columns, rows)
+                    counts[table] += len(rows)
+        finally:
+            conn.execute("COMMIT")
+    return counts
+
+
+def read_archive(path):
+    """ファイルのブロックを (table, rows) として順に返す"""
+    with open_archive(path, "r") as f:
+        header = loads(f.readline() or "null")
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a weather archive")
+        if header.get("version", 0) > VERSION:
+            raise ValueError(f"{path}: unsupported archive version {header['version']}")
+        for line in f:
+            block = loads(line)
+            columns = AREA_COLUMNS if block["table"] == "areas" else FORECAST_COLUMNS
+            data = block["columns"]
+            yield block["table"], list(zip(*(data[c] for c in columns)))
+
+
+class _Importer:
+    """ブロックを書き込みスレッドへ順に渡す。前のブロックの書き込み中に次を読む"""
+
+    def __init__(self, db):
+        self.db = db
+        self.pending = None
+        self.counts = {"areas": 0, "forecasts": 0, "inserted": 0}
+
+    def add(self, table, rows):
+        self.counts[table] += len(rows)
+        areas, forecasts = (rows, ()) if table == "areas" else ((), rows)
+        future = self.db.import_rows(areas, forecasts, wait=False)
+        self.wait()
+        self.pending = future
+
+    def wait(self):
+        if self.pending is not None:
+            self.counts["inserted"] += self.pending.result()
+            self.pending = None
+        return self.counts
+
+
+def import_archive(db, path):
+    """ファイルを取り込む。戻り値は読んだ行数と、実際に挿入した予報の行数"""
+    importer = _Importer(db)
+    for table, rows in read_archive(path):
+        importer.add(table, rows)
+    return importer.wait()
+
+
+def _legacy_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def merge_database(db, path, chunk_rows=CHUNK_ROWS):
+    """古いDBファイル（どのバージョンのスキーマでも）の履歴を取り込む。元のファイルは変更しない"""
+    src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    importer = _Importer(db)
+    try:
+        if "code" in _legacy_columns(src, "areas"):
+            cur = src.execute("SELECT code, name FROM areas")
+            for rows in _chunks(cur, chunk_rows):
+                importer.add("areas", rows)
+        columns = _legacy_columns(src, "forecasts")
+        if columns:
+            # 発表時刻の列が無い古いスキーマは NULL として取り込む
+            select = [c if c in columns else "NULL" for c in FORECAST_COLUMNS]
+            cur = src.execute(f"SELECT {', '.join(select)} FROM forecasts ORDER BY id")
+            for rows in _chunks(cur, chunk_rows):
+                importer.add("forecasts", rows)
+        return importer.wait()
+    finally:
+        src.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="予報履歴のエクスポート・インポート・旧DBの統合")
+    parser.add_argument("--db", default=DB_NAME)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="DBをファイルに書き出す")
+    p_export.add_argument("path")
+    p_export.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    p_import = sub.add_parser("import", help="ファイルをDBに取り込む")
+    p_import.add_argument("path")
+    p_merge = sub.add_parser("merge", help="古いDBファイルの履歴をDBに取り込む")
+    p_merge.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    db = WeatherDB(args.db)
+    try:
+        if args.command == "export":
+            print(export_archive(db, args.path, args.chunk_rows))
+        elif args.command == "import":
+            print(import_archive(db, args.path))
+        else:
+            for path in args.paths:
+                print(f"{path}: {merge_database(db, path)}")
+    finally:
+        db.close()
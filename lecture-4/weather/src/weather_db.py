@@ -0,0 +1,393 @@
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from metrics import metrics
+
+DB_NAME = "weather_database.db"
+
+
+def to_temp(value):
+    """気温を INTEGER / NULL に変換（"-" や空文字は NULL）"""
+    if value is None or value in ("-", ""):
+        return None
+    return int(float(value))
+
+
+def _migrate_v1(cur):
+    """気温を INTEGER 型に変更し、検索用の複合インデックスを作成"""
+    cur.execute('''CREATE TABLE forecasts_v1 (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    area_code TEXT,
+                    forecast_date TEXT,
+                    weather TEXT,
+                    wind TEXT,
+                    temp_min INTEGER,
+                    temp_max INTEGER,
+                    created_at TEXT)''')
+    cur.execute('''INSERT INTO forecasts_v1 (id, area_code, forecast_date, weather, wind, temp_min, temp_max, created_at)
+                   SELECT id, area_code, forecast_date, weather, wind,
+                          CASE WHEN TRIM(temp_min) IN ('', '-') THEN NULL ELSE CAST(temp_min AS INTEGER) END,
+                          CASE WHEN TRIM(temp_max) IN ('', '-') THEN NULL ELSE CAST(temp_max AS INTEGER) END,
+                          created_at
+                   FROM forecasts''')
+    cur.execute("DROP TABLE forecasts")
+    cur.execute("ALTER TABLE forecasts_v1 RENAME TO forecasts")
+    cur.execute("CREATE INDEX idx_forecasts_area_created ON forecasts (area_code, created_at)")
+    cur.execute("CREATE INDEX idx_forecasts_area_date_created ON forecasts (area_code, forecast_date, created_at)")
+
+
+def _migrate_v2(cur):
+    """発表時刻 (reportDatetime) の列を追加し、同じ発表を重複して保存しないようにする"""
+    cur.execute("ALTER TABLE forecasts ADD COLUMN report_datetime TEXT")
+    cur.execute('''CREATE UNIQUE INDEX idx_forecasts_report
+                   ON forecasts (area_code, forecast_date, report_datetime)''')
+
+
+# スキーマのマイグレーション（PRAGMA user_version がバージョン番号）
+MIGRATIONS = [_migrate_v1, _migrate_v2]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# 接続ごとに設定するPRAGMA（WALで読み込みと書き込みを並行させる）
+PRAGMAS = [
+    "PRAGMA auto_vacuum = INCREMENTAL",   # 新規DBのみ有効（既存DBは compact() で切り替える）
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",     # 約16MB
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+]
+WRITE_BATCH_SIZE = 64
+# 読み込み用の接続の最大数（Webアプリで複数のセッションが同時に読むため）
+READ_POOL_SIZE = 4
+# 履歴の間引き: この日数より古い履歴は1時間に1件、さらに古いものは1日に1件だけ残す
+HOURLY_AFTER_DAYS = 7
+DAILY_AFTER_DAYS = 30
+# compact_if_due() が間引きを行う間隔
+COMPACT_INTERVAL = timedelta(days=1)
+_STOP = object()
+
+
+def connect(db_name):
+    conn = sqlite3.connect(db_name, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+# --- 書き込み専用スレッド ---
+class WriteQueue:
+    """書き込みを1本の専用接続に集約するキュー
+
+    submit() された書き込み関数はキューに積まれ、専用スレッドがまとめて
+    1トランザクションでコミットする（グループコミット）。書き込み同士が
+    "database is locked" で衝突することがなく、WALにより読み込みも妨げない。
+    exclusive=True のジョブ（VACUUM など）は他のジョブと混ぜずに単独で実行する。
+    counter を渡すと、コミットできたジョブの戻り値（行数）をその名前で metrics に数える。
+    """
+
+    def __init__(self, conn, batch_size=WRITE_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="WeatherDB-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, exclusive=False, counter=None):
+        """fn(cur) を書き込みスレッドで実行する。結果は Future で返す"""
+        future = Future()
+        self._queue.put((fn, future, exclusive, counter))
+        return future
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        pending = None
+        while True:
+            job = pending or self._queue.get()
+            pending = None
+            if job is _STOP:
+                break
+            batch = [job]
+            while not job[2] and len(batch) < self.batch_size:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP or nxt[2]:
+                    pending = nxt
+                    break
+                batch.append(nxt)
+            self._commit(batch)
+
+    def _commit(self, batch):
+        cur = self.conn.cursor()
+        try:
+            with metrics.span("db.commit", jobs=len(batch)):
+                results = [fn(cur) for fn, _, _, _ in batch]
+                self.conn.commit()
+        except Exception as ex:
+            self.conn.rollback()
+            # どの書き込みが失敗したか分かるよう1件ずつやり直す
+            if len(batch) > 1:
+                for job in batch:
+                    self._commit([job])
+                return
+            batch[0][1].set_exception(ex)
+            return
+        # ロールバックされた行ややり直しで二重に数えないよう、コミットの後で数える
+        for (_, future, _, counter), result in zip(batch, results):
+            if counter:
+                metrics.count(counter, result)
+            future.set_result(result)
+
+
+# --- 読み込み用の接続プール ---
+class ReadPool:
+    """読み込み専用の接続を最大 size 本まで作って使い回す
+
+    sqlite3 の接続は同時に1つのスレッドしか使えないので、1本の接続を全セッションで
+    共有すると読み込みが直列になる。WALなら読み込み同士も書き込みとも並行できる。
+    """
+
+    def __init__(self, factory, size=READ_POOL_SIZE):
+        self.factory = factory
+        self.size = size
+        self.created = 0
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+            # 上限まで作ってあれば、他のスレッドが返すのを待つ
+            conn = self.factory() if create else self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def _connect_reader(db_name):
+    conn = connect(db_name)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+# --- データベース管理クラス ---
+class WeatherDB:
+    def __init__(self, db_name=DB_NAME, read_pool_size=READ_POOL_SIZE):
+        self.conn = connect(db_name)
+        self.init_tables()
+        # :memory: は接続ごとに別DBになるので読み書きも同じ接続で行う
+        if db_name == ":memory:":
+            self.writer = WriteQueue(self.conn)
+            self.pool = ReadPool(lambda: self.conn, 1)
+        else:
+            self.writer = WriteQueue(connect(db_name))
+            self.pool = ReadPool(lambda: _connect_reader(db_name), read_pool_size)
+
+    def reader(self):
+        """読み込み用の接続を借りる: with db.reader() as conn: ..."""
+        return self.pool.connection()
+
+    def init_tables(self):
+        cur = self.conn.cursor()
+        # エリア情報テーブル
+        cur.execute("CREATE TABLE IF NOT EXISTS areas (code TEXT PRIMARY KEY, name TEXT)")
+        # DBの管理用の値（前回の compact() の時刻など）
+        cur.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        # 予報データテーブル (created_atで履歴を管理)。旧バージョンの形で作成し migrate() で移行する
+        cur.execute('''CREATE TABLE IF NOT EXISTS forecasts (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        area_code TEXT,
+                        forecast_date TEXT,
+                        weather TEXT,
+                        wind TEXT,
+                        temp_min TEXT,
+                        temp_max TEXT,
+                        created_at TEXT)''')
+        self.conn.commit()
+        self.migrate()
+
+    def migrate(self):
+        """既存のDBファイルをその場で最新のスキーマに移行する"""
+        cur = self.conn.cursor()
+        version = cur.execute("PRAGMA user_version").fetchone()[0]
+        for i in range(version, SCHEMA_VERSION):
+            cur.execute("BEGIN")
+            try:
+                MIGRATIONS[i](cur)
+                cur.execute(f"PRAGMA user_version = {i + 1}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    @staticmethod
+    def _insert(cur, items, now):
+        """items: (area_code, area_name, forecasts) のリストを executemany で保存
+
+        同じ発表時刻の予報が保存済みなら挿入しない。戻り値は実際に挿入した行数
+        """
+        # エリア情報の保存
+        cur.executemany("INSERT OR REPLACE INTO areas VALUES (?, ?)",
+                        [(area_code, area_name) for area_code, area_name, _ in items])
+        # 予報データの保存
+        rows = [(area_code, f['date'], f['weather'], f['wind'], to_temp(f['min']), to_temp(f['max']), now,
+                 f.get('report_datetime'))
+                for area_code, _, forecasts in items for f in forecasts]
+        cur.executemany('''INSERT OR IGNORE INTO forecasts
+                           (area_code, forecast_date, weather, wind, temp_min, temp_max, created_at, report_datetime)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+        return max(cur.rowcount, 0)
+
+    def save_data(self, area_code, area_name, forecasts, wait=True):
+        return self.save_many([(area_code, area_name, forecasts)], wait)
+
+    def save_many(self, items, wait=True):
+        """複数エリアの予報を1トランザクションでまとめて保存する
+
+        items: (area_code, area_name, forecasts) のイテラブル
+        wait=False の場合は書き込みの完了を待たずに Future を返す
+        """
+        items = list(items)
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        future = self.writer.submit(lambda cur: self._insert(cur, items, now), counter="db.rows_written")
+        return future.result() if wait else future
+
+    @staticmethod
+    def _import(cur, areas, rows):
+        """エクスポートや旧DBの行を取り込む。すでにある行（同じ発表、発表時刻が無ければ
+        同じ取得時刻の行）は挿入しない。戻り値は実際に挿入した行数
+
+        rows: (area_code, forecast_date, weather, wind, temp_min, temp_max, created_at, report_datetime)
+        """
+        cur.executemany("INSERT OR IGNORE INTO areas VALUES (?, ?)", areas)
+        cur.executemany('''INSERT OR IGNORE INTO forecasts
+                           (area_code, forecast_date, weather, wind, temp_min, temp_max, created_at, report_datetime)
+                           SELECT ?, ?, ?, ?, ?, ?, ?, ?
+                           WHERE NOT EXISTS (SELECT 1 FROM forecasts
+                                             WHERE area_code = ? AND forecast_date = ? AND created_at = ?
+                                               AND report_datetime IS ?)''',
+                        ((a, d, w, wi, to_temp(lo), to_temp(hi), c, r, a, d, c, r)
+                         for a, d, w, wi, lo, hi, c, r in rows))
+        return max(cur.rowcount, 0)
+
+    def import_rows(self, areas=(), rows=(), wait=True):
+        """areas: (code, name) / rows: 予報の行（_import を参照）を1トランザクションで取り込む"""
+        areas, rows = list(areas), list(rows)
+        future = self.writer.submit(lambda cur: self._import(cur, areas, rows), counter="db.rows_imported")
+        return future.result() if wait else future
+
+    @staticmethod
+    def _thin(cur, cutoff, bucket_len):
+        """cutoff より古い履歴を、発表時刻の先頭 bucket_len 文字ごとに最新1件へ間引く"""
+        bucket = f"substr(COALESCE(report_datetime, created_at), 1, {bucket_len})"
+        cur.execute(f'''DELETE FROM forecasts WHERE created_at < ? AND id NOT IN (
+                            SELECT MAX(id) FROM forecasts WHERE created_at < ?
+                            GROUP BY area_code, forecast_date, {bucket})''', (cutoff, cutoff))
+        return cur.rowcount
+
+    @staticmethod
+    def _vacuum(cur):
+        if cur.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # 既存DBは一度だけ全体VACUUMして増分VACUUMに切り替える
+            cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            cur.execute("VACUUM")
+        else:
+            cur.execute("PRAGMA incremental_vacuum").fetchall()
+
+    def compact(self, hourly_after_days=HOURLY_AFTER_DAYS, daily_after_days=DAILY_AFTER_DAYS, vacuum=True):
+        """古い履歴を間引き（時間単位→日単位）、空いた領域をファイルから解放する
+
+        戻り値は削除した行数
+        """
+        now = datetime.now()
+        hourly_cutoff = (now - timedelta(days=hourly_after_days)).strftime("%Y-%m-%d %H:%M:%S")
+        daily_cutoff = (now - timedelta(days=daily_after_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+        def job(cur):
+            deleted = self._thin(cur, hourly_cutoff, 13) + self._thin(cur, daily_cutoff, 10)
+            cur.execute("INSERT OR REPLACE INTO meta VALUES ('last_compacted', ?)",
+                        (now.strftime("%Y-%m-%d %H:%M:%S"),))
+            cur.connection.commit()
+            if vacuum:
+                self._vacuum(cur)
+            return deleted
+
+        return self.writer.submit(job, exclusive=True).result()
+
+    def last_compacted(self):
+        """前回 compact() した時刻（一度もしていなければ None）"""
+        with self.reader() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'last_compacted'").fetchone()
+        return row and datetime.strptime(row[0], "%Y-%m-%d %H:%M:%S")
+
+    def compact_if_due(self, interval=COMPACT_INTERVAL):
+        """前回から interval 以上たっていれば compact() する。戻り値は削除した行数（しなければ None）
+
+        間引きは書き込みを止める排他のジョブ（初回は全体の VACUUM）なので、アプリの起動時ではなく
+        スケジューラや prefetch.py --compact から呼ぶ。
+        """
+        last = self.last_compacted()
+        if last is not None and datetime.now() - last < interval:
+            return None
+        return self.compact()
+
+    def close(self):
+        self.writer.close()
+        if self.writer.conn is not self.conn:
+            self.writer.conn.close()
+        self.pool.close()
+        self.conn.close()
+
+    def get_latest(self, area_code):
+        """特定のエリアの最新取得分（3日分）を日付の順に取得"""
+        # 同じ取得時刻の行はインデックスを逆順にたどると id の降順になるので、日付の順を明示する
+        with self.reader() as conn:
+            return conn.execute('''SELECT * FROM forecasts WHERE area_code = ?
+                                   ORDER BY created_at DESC, forecast_date ASC LIMIT 3''',
+                                (area_code,)).fetchall()
+
+    def latest_report(self, area_code):
+        """特定のエリアで保存済みの最新の発表時刻 (reportDatetime)。無ければ None"""
+        with self.reader() as conn:
+            return conn.execute("SELECT MAX(report_datetime) FROM forecasts WHERE area_code = ?",
+                                (area_code,)).fetchone()[0]
+
+    def get_by_date(self, area_code, date_str, limit=None, after=None):
+        """特定の日付の予報を履歴から検索（新しい順）
+
+        limit を指定すると最大 limit 件を返す。続きは最後の行の (created_at, id) を
+        after に渡して取得する（キーセットページング）。
+        """
+        sql = '''SELECT * FROM forecasts WHERE area_code = ? AND forecast_date = ?'''
+        params = [area_code, date_str]
+        if after is not None:
+            sql += " AND (created_at, id) < (?, ?)"
+            params += list(after)
+        sql += " ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self.reader() as conn:
+            return conn.execute(sql, params).fetchall()